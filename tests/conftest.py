@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_extraction(n_patients=150, hr_list=(-1, -24), n_features=8, missing=0.15, seed=0):
+    """Synthetic extraction with the layout of the notebooks: PatientID, hr, NAV and numeric features."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for hr in hr_list:
+        X = rng.normal(size=(n_patients, n_features))
+        X[:, 1] = X[:, 0] + 0.3 * rng.normal(size=n_patients)
+        logits = 1.5 * X[:, 0] - X[:, 2] + 0.5 * X[:, 3]
+        nav = (logits + rng.normal(size=n_patients) > 1.0).astype(int)
+        X[rng.random(X.shape) < missing] = np.nan
+        frame = pd.DataFrame(X, columns=[f'feature_{i}' for i in range(n_features)])
+        frame.insert(0, 'PatientID', np.arange(n_patients))
+        frame.insert(1, 'hr', hr)
+        frame['NAV'] = nav
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture(scope='session')
+def extraction():
+    return make_extraction()
+
+
+@pytest.fixture(scope='session')
+def models():
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+    return {'LogisticRegression': LogisticRegression(random_state=42),
+            'DecisionTree': DecisionTreeClassifier(max_depth=3, random_state=42)}
+
+
+@pytest.fixture(scope='session')
+def imputer():
+    from sklearn.experimental import enable_iterative_imputer  # noqa
+    from sklearn.impute import IterativeImputer
+    return IterativeImputer(max_iter=10, random_state=42)
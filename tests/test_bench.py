@@ -0,0 +1,194 @@
+import os
+
+import numpy as np
+import pytest
+
+from vap_utils.bench import (adaptive_sweep, coarse_k_grid, run_experiment, successive_halving,
+                             throughput_benchmark)
+from vap_utils.metrics import METRICS
+
+SELECTORS = ['SelectKBest_f', 'GenericUnivariateSelect', 'mRMR']
+
+
+def assert_same_scores(results, expected):
+    assert results.keys() == expected.keys()
+    for hr_key, selectors in expected.items():
+        for selector, models in selectors.items():
+            for model, values in models.items():
+                for metric in METRICS:
+                    np.testing.assert_allclose(results[hr_key][selector][model][metric], values[metric],
+                                               err_msg=f'{hr_key} {selector} {model} {metric}')
+
+
+@pytest.fixture(scope='module')
+def serial_run(extraction, models, imputer):
+    return run_experiment(extraction, [-1, -24], SELECTORS, models, n_jobs=1, memoize=False, imputer=imputer)
+
+
+@pytest.mark.parametrize('n_jobs, memoize', [(1, True), (2, False), (2, True)])
+def test_pool_and_memo_match_serial(extraction, models, imputer, serial_run, n_jobs, memoize):
+    results, ranked_features = run_experiment(extraction, [-1, -24], SELECTORS, models, n_jobs=n_jobs,
+                                              memoize=memoize, imputer=imputer)
+    expected_results, expected_rankings = serial_run
+    assert ranked_features == expected_rankings
+    assert_same_scores(results, expected_results)
+
+
+def test_memo_serves_identical_rankings(extraction, models, imputer):
+    results, ranked_features = run_experiment(extraction, [-1], SELECTORS, models, imputer=imputer)
+    # SelectKBest_f and GenericUnivariateSelect rank by the same F-statistic
+    assert ranked_features['hr=-1']['SelectKBest_f'] == ranked_features['hr=-1']['GenericUnivariateSelect']
+    served = results['hr=-1']['GenericUnivariateSelect']['DecisionTree']
+    assert np.isnan(served['fit_seconds']).all()
+    assert served['PR_AUC'] == results['hr=-1']['SelectKBest_f']['DecisionTree']['PR_AUC']
+
+
+@pytest.mark.parametrize('model_size', [False, True])
+def test_model_size_is_opt_in(extraction, models, imputer, model_size):
+    results, _ = run_experiment(extraction, [-1], ['SelectKBest_f'], models, imputer=imputer, model_size=model_size)
+    model_bytes = np.asarray(results['hr=-1']['SelectKBest_f']['DecisionTree']['model_bytes'])
+    assert (model_bytes > 0).all() if model_size else np.isnan(model_bytes).all()
+
+
+def test_serial_run_restores_the_calling_process(extraction, models, imputer, monkeypatch):
+    from threadpoolctl import threadpool_info
+
+    from vap_utils import bench
+    monkeypatch.delenv('OMP_NUM_THREADS', raising=False)
+    monkeypatch.setenv('MKL_NUM_THREADS', '3')
+    before = [pool['num_threads'] for pool in threadpool_info()]
+    run_experiment(extraction, [-1], ['SelectKBest_f'], models, n_jobs=1, threads_per_worker=1, imputer=imputer)
+    assert 'OMP_NUM_THREADS' not in os.environ
+    assert os.environ['MKL_NUM_THREADS'] == '3'
+    assert [pool['num_threads'] for pool in threadpool_info()] == before
+    assert bench._WORKER == {}
+
+
+@pytest.mark.parametrize('memoize', [True, 'set'])
+def test_catboost_pools_match_float_fits(extraction, imputer, tmp_path, monkeypatch, memoize):
+    catboost = pytest.importorskip('catboost')
+    monkeypatch.chdir(tmp_path)  # catboost_info/
+    models = {'CatBoost': catboost.CatBoostClassifier(iterations=50, verbose=0, random_state=42, thread_count=1)}
+    options = {'memoize': memoize, 'imputer': imputer}
+    expected, _ = run_experiment(extraction, [-1], ['SelectKBest_f', 'mRMR'], models, **options)
+    results, _ = run_experiment(extraction, [-1], ['SelectKBest_f', 'mRMR'], models, catboost_pools=True, **options)
+    assert_same_scores(results, expected)
+
+
+@pytest.fixture(scope='module')
+def cv_runs(extraction, models, imputer):
+    return [run_experiment(extraction, [-1], ['SelectKBest_f', 'mRMR'], models, cv=True, n_splits=3, n_jobs=n_jobs,
+                           imputer=imputer)
+            for n_jobs in (1, 2)]
+
+
+def test_cv_pool_matches_serial(cv_runs):
+    (serial, serial_rankings), (pool, pool_rankings) = cv_runs
+    assert pool_rankings == serial_rankings
+    for selector, selector_results in serial['hr=-1'].items():
+        for model, values in selector_results.items():
+            for column in METRICS + [f'{metric}_folds' for metric in METRICS]:
+                np.testing.assert_array_equal(pool['hr=-1'][selector][model][column], values[column])
+
+
+def test_cv_folds_layout(cv_runs):
+    results, ranked_features = cv_runs[0]
+    for selector, fold_rankings in ranked_features['hr=-1'].items():
+        assert len(fold_rankings) == 3
+        n_k = max(len(ranking) for ranking in fold_rankings)
+        for model, values in results['hr=-1'][selector].items():
+            for metric in METRICS:
+                folds = np.asarray(values[f'{metric}_folds'])
+                assert folds.shape == (n_k, 3)
+                np.testing.assert_allclose(values[metric], np.nanmean(folds, axis=1))
+
+
+def adaptive_ks(curve, k_step, patience):
+    # k values the adaptive sweep evaluates on a fully known curve (index k - 1)
+    grid = coarse_k_grid(len(curve), k_step)
+    best_value, best_k, since_best = -np.inf, None, 0
+    evaluated = []
+    for k in grid:
+        evaluated.append(k)
+        value = -np.inf if np.isnan(curve[k - 1]) else curve[k - 1]
+        if best_k is None or value > best_value:
+            best_value, best_k, since_best = value, k, 0
+        else:
+            since_best += 1
+        if since_best == patience:
+            break
+    refined = range(max(1, best_k - k_step + 1), min(len(curve), best_k + k_step - 1) + 1)
+    return sorted(set(evaluated) | set(refined))
+
+
+def test_adaptive_sweep_stops_after_patience():
+    # Coarse grid 1, 6, 11, 16, 21, 26, 30 on a curve peaking at k = 8: the best coarse
+    # point is 6, then 11, 16 and 21 do not improve and the curve stops
+    evaluated = []
+
+    def evaluate(cells):
+        evaluated.extend(k for _, _, k, _ in cells)
+        return {cell: {'PR_AUC': -abs(cell[2] - 8)} for cell in cells}
+
+    scores = adaptive_sweep({('hr=-1', 'selector', 'model'): 30}, evaluate, k_step=5, patience=3)
+    assert evaluated[:5] == [1, 6, 11, 16, 21]
+    assert sorted(k for _, _, k, _ in scores) == sorted(set(range(1, 12)) | {16, 21})
+
+
+def test_adaptive_run_matches_full_grid(extraction, models, imputer, serial_run):
+    results, ranked_features = run_experiment(extraction, [-1, -24], SELECTORS, models, memoize=False, imputer=imputer,
+                                              k_strategy='adaptive', k_step=2, patience=2)
+    expected, expected_rankings = serial_run
+    assert ranked_features == expected_rankings
+    for hr_key, selectors in expected.items():
+        for selector, selector_results in selectors.items():
+            for model, values in selector_results.items():
+                evaluated = np.asarray(adaptive_ks(values['PR_AUC'], k_step=2, patience=2)) - 1
+                for metric in METRICS:
+                    curve = np.asarray(results[hr_key][selector][model][metric])
+                    assert len(curve) == len(values[metric])
+                    np.testing.assert_array_equal(curve[evaluated], np.asarray(values[metric])[evaluated])
+                    assert np.isnan(np.delete(curve, evaluated)).all()
+
+
+def test_successive_halving_promotes_by_eta():
+    # 9 candidates, 100 features: 4 then 12 points, 3 survivors, then one finalist on every k
+    curves = {('hr=-1', f'selector_{i}', 'model'): 100 for i in range(9)}
+
+    def evaluate(cells):
+        return {cell: {'PR_AUC': int(cell[1][-1]) - abs(cell[2] - 50) / 100} for cell in cells}
+
+    scores, race_log = successive_halving(curves, evaluate, eta=3, min_points=4)
+    assert race_log.groupby(['round', 'status']).size().to_dict() == {
+        (0, 'eliminated'): 6, (1, 'eliminated'): 2, (2, 'finalist'): 1}
+    finalist = race_log[race_log['status'] == 'finalist'].iloc[0]
+    assert finalist['selector'] == 'selector_8' and finalist['n_k'] == 100 and finalist['best_k'] == 50
+    survivors = race_log[race_log['round'] >= 1]
+    assert set(survivors['selector']) == {'selector_6', 'selector_7', 'selector_8'}
+    assert (race_log[race_log['round'] == 0]['n_k'] == 4).all()
+
+
+def test_race_finalists_match_full_grid(extraction, models, imputer, serial_run):
+    results, _, race_log = run_experiment(extraction, [-1, -24], SELECTORS, models, memoize=False, imputer=imputer,
+                                          k_strategy='race', eta=3)
+    expected, _ = serial_run
+    n_candidates = len(SELECTORS) * len(models)
+    for hr_key, hr_log in race_log.groupby('hr'):
+        alive = n_candidates
+        for race_round, round_log in hr_log.groupby('round'):
+            if (round_log['status'] == 'finalist').any():
+                assert len(round_log) == alive
+                break
+            assert len(round_log) == alive - int(np.ceil(alive / 3))
+            alive = int(np.ceil(alive / 3))
+        for finalist in hr_log[hr_log['status'] == 'finalist'].itertuples():
+            for metric in METRICS:
+                np.testing.assert_array_equal(results[hr_key][finalist.selector][finalist.model][metric],
+                                              expected[hr_key][finalist.selector][finalist.model][metric])
+
+
+def test_throughput_benchmark_smoke(extraction, models, imputer):
+    summary = throughput_benchmark(extraction, -1, models, ks=[1, 4], budgets=[(1, 1), (2, 1)], imputer=imputer)
+    assert sorted(zip(summary['workers'], summary['threads_per_worker'])) == [(1, 1), (2, 1)]
+    assert (summary['cells'] == 2 * len(models)).all()
+    assert (summary['cells_per_second'] > 0).all()
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+from sklearn.impute import IterativeImputer
+
+from vap_utils.cache import _imputer_key, fit_transform_cached
+
+
+class CountingImputer(IterativeImputer):
+    fits = 0
+
+    def fit_transform(self, X, y=None):
+        CountingImputer.fits += 1
+        return super().fit_transform(X, y)
+
+
+@pytest.fixture
+def data(extraction):
+    hr = extraction[extraction['hr'] == -1].drop(columns=['PatientID', 'hr', 'NAV'])
+    return hr.iloc[:100], hr.iloc[100:]
+
+
+@pytest.fixture(autouse=True)
+def reset_fits():
+    CountingImputer.fits = 0
+
+
+def test_second_call_hits_the_cache(tmp_path, data):
+    X_train, X_test = data
+    cache_dir = str(tmp_path / 'imputers')
+    first = fit_transform_cached(CountingImputer(max_iter=10, random_state=42), X_train, X_test, cache_dir=cache_dir)
+    second = fit_transform_cached(CountingImputer(max_iter=10, random_state=42), X_train, X_test, cache_dir=cache_dir)
+    assert CountingImputer.fits == 1
+    np.testing.assert_array_equal(second[1], first[1])
+    np.testing.assert_array_equal(second[2], first[2])
+    # The loaded imputer is the fitted one
+    np.testing.assert_array_equal(second[0].transform(X_test), first[2])
+    entry, = os.listdir(cache_dir)
+    files = sorted(os.listdir(os.path.join(cache_dir, entry)))
+    assert files[0] == 'imputer.joblib' and files[1].startswith('test_') and files[2] == 'train.npy'
+    assert len(files) == 3
+
+
+def test_key_follows_data_params_and_columns(data):
+    X_train, _ = data
+    imputer = IterativeImputer(max_iter=10, random_state=42)
+    key = _imputer_key(imputer, X_train)
+    assert _imputer_key(IterativeImputer(max_iter=10, random_state=42), X_train.copy()) == key
+    changed = X_train.copy()
+    changed.iloc[0, 0] += 1
+    assert _imputer_key(imputer, changed) != key
+    assert _imputer_key(IterativeImputer(max_iter=10, random_state=0), X_train) != key
+    assert _imputer_key(imputer, X_train[X_train.columns[::-1]]) != key
+
+
+def test_new_test_matrix_reuses_the_fit(tmp_path, data):
+    X_train, X_test = data
+    cache_dir = str(tmp_path / 'imputers')
+    fit_transform_cached(CountingImputer(max_iter=10, random_state=42), X_train, X_test, cache_dir=cache_dir)
+    _, _, X_head = fit_transform_cached(CountingImputer(max_iter=10, random_state=42), X_train, X_test.iloc[:10],
+                                        cache_dir=cache_dir)
+    assert CountingImputer.fits == 1
+    entry, = os.listdir(cache_dir)
+    assert len([name for name in os.listdir(os.path.join(cache_dir, entry)) if name.startswith('test_')]) == 2
+    assert X_head.shape == (10, X_test.shape[1])
+
+
+def test_no_cache_dir_bypasses_the_cache(tmp_path, data, monkeypatch):
+    X_train, X_test = data
+    monkeypatch.chdir(tmp_path)
+    for _ in range(2):
+        _, X_train_imp, X_test_imp = fit_transform_cached(CountingImputer(max_iter=10, random_state=42), X_train,
+                                                          X_test, cache_dir=None)
+    assert CountingImputer.fits == 2
+    assert os.listdir(tmp_path) == []
+    assert not np.isnan(X_train_imp).any() and not np.isnan(X_test_imp).any()
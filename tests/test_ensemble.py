@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from vap_utils.ensemble import BalancedBaggingClassifier
+from vap_utils.sampling import balanced_bags
+
+
+@pytest.fixture(autouse=True)
+def four_cores(monkeypatch):
+    # n_jobs=2 runs two members at once even on a single-core machine
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+
+
+@pytest.fixture(scope='module')
+def labelled():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 5))
+    y = (X[:, 0] + rng.normal(size=600) > 1.6).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_members_are_fitted_on_their_bags(labelled, n_jobs):
+    X, y = labelled
+    model = BalancedBaggingClassifier(DecisionTreeClassifier(max_depth=3, random_state=42), n_jobs=n_jobs).fit(X, y)
+    bags = balanced_bags(y)
+    assert len(model.estimators_) == len(bags)
+    for member, bag in zip(model.estimators_, bags):
+        expected = DecisionTreeClassifier(max_depth=3, random_state=42).fit(X[bag], y[bag])
+        np.testing.assert_array_equal(member.predict_proba(X), expected.predict_proba(X))
+    proba = model.predict_proba(X)
+    assert proba.shape == (len(X), 2)
+    np.testing.assert_allclose(proba, np.mean([member.predict_proba(X) for member in model.estimators_], axis=0))
+    np.testing.assert_array_equal(model.predict(X), model.classes_[proba.argmax(axis=1)])
+
+
+def test_parallel_fit_matches_serial(labelled):
+    X, y = labelled
+    probas = [BalancedBaggingClassifier(DecisionTreeClassifier(random_state=42), n_estimators=3, n_jobs=n_jobs)
+              .fit(X, y).predict_proba(X) for n_jobs in (1, 2)]
+    np.testing.assert_array_equal(probas[0], probas[1])
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from sklearn.experimental import enable_iterative_imputer  # noqa
+from sklearn.impute import IterativeImputer
+
+from vap_utils.impute import FastIterativeImputer
+
+
+def correlated_matrix(n_rows, n_features=6, missing=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n_rows, 2))
+    X = latent @ rng.normal(size=(2, n_features)) + 0.3 * rng.normal(size=(n_rows, n_features))
+    X_missing = X.copy()
+    X_missing[rng.random(X.shape) < missing] = np.nan
+    return X, X_missing
+
+
+def test_matches_iterative_imputer():
+    _, X = correlated_matrix(500)
+    expected = IterativeImputer(max_iter=1000, random_state=42).fit_transform(X)
+    Xt = FastIterativeImputer(max_iter=1000, random_state=42).fit_transform(X)
+    scale = np.nanmax(np.abs(X))
+    np.testing.assert_allclose(Xt, expected, atol=1e-2 * scale)
+
+
+def test_transform_replays_fit():
+    _, X = correlated_matrix(300)
+    imputer = FastIterativeImputer(random_state=42)
+    np.testing.assert_allclose(imputer.fit_transform(X), imputer.transform(X))
+    assert imputer.n_iter_ == len(imputer.convergence_)
+
+
+def test_columns_without_observed_values():
+    _, X = correlated_matrix(100)
+    X[:, 2] = np.nan
+    Xt = FastIterativeImputer(random_state=42).fit_transform(X)
+    assert not np.isnan(Xt).any()
+    assert (Xt[:, 2] == 0).all()
+
+
+@pytest.mark.parametrize('n_nearest_features', [None, 3])
+def test_imputes_close_to_truth(n_nearest_features):
+    X, X_missing = correlated_matrix(500)
+    Xt = FastIterativeImputer(n_nearest_features=n_nearest_features, random_state=42).fit_transform(X_missing)
+    mask = np.isnan(X_missing)
+    mean_filled = np.where(mask, np.nanmean(X_missing, axis=0), X_missing)
+    assert np.abs(Xt - X)[mask].mean() < np.abs(mean_filled - X)[mask].mean()
+
+
+@pytest.mark.parametrize('n_nearest_features', [None, 3])
+def test_warm_start_converges_faster(n_nearest_features):
+    _, X = correlated_matrix(3300, n_features=10, missing=0.3, seed=1)
+    params = {'tol': 1e-4, 'n_nearest_features': n_nearest_features, 'random_state': 42}
+    warm = FastIterativeImputer(warm_start=True, **params).fit(X[:3000])
+    Xt_warm = warm.fit_transform(X)
+    cold = FastIterativeImputer(**params)
+    Xt_cold = cold.fit_transform(X)
+
+    assert warm.n_iter_ < cold.n_iter_ / 2
+    np.testing.assert_allclose(Xt_warm, Xt_cold, atol=1e-3 * np.nanmax(np.abs(X)))
+    np.testing.assert_allclose(warm.transform(X), Xt_warm)
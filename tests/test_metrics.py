@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sklearn.metrics import (accuracy_score, average_precision_score, f1_score, precision_score, recall_score,
+                             roc_auc_score)
+
+from vap_utils.metrics import METRICS, binary_metrics, bootstrap_ci
+
+
+def sklearn_metrics(y_true, y_prob, y_pred, sample_weight=None):
+    return {
+        'AUC': roc_auc_score(y_true, y_prob, sample_weight=sample_weight),
+        'PR_AUC': average_precision_score(y_true, y_prob, sample_weight=sample_weight),
+        'Accuracy': accuracy_score(y_true, y_pred, sample_weight=sample_weight),
+        'Recall': recall_score(y_true, y_pred, sample_weight=sample_weight, zero_division=0),
+        'Precision': precision_score(y_true, y_pred, sample_weight=sample_weight, zero_division=0),
+        'F1': f1_score(y_true, y_pred, sample_weight=sample_weight, zero_division=0),
+    }
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('ties', [False, True])
+def test_binary_metrics_match_sklearn(seed, ties):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 2, 300)
+    y_prob = rng.random(300)
+    if ties:
+        y_prob = np.round(y_prob, 1)
+    y_pred = (y_prob > 0.5).astype(int)
+    scores = binary_metrics(y_true, y_prob, y_pred)
+    for metric, value in sklearn_metrics(y_true, y_prob, y_pred).items():
+        assert scores[metric] == pytest.approx(value), metric
+
+
+def test_binary_metrics_weighted_and_batched():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 2, 200)
+    y_prob = np.round(rng.random((4, 200)), 2)
+    weights = rng.integers(0, 3, (4, 200))
+    scores = binary_metrics(y_true, y_prob, sample_weight=weights)
+    for row in range(4):
+        expected = sklearn_metrics(y_true, y_prob[row], y_prob[row] > 0.5, sample_weight=weights[row])
+        for metric, value in expected.items():
+            assert scores[metric][row] == pytest.approx(value), (metric, row)
+
+
+def test_binary_metrics_without_positives():
+    scores = binary_metrics(np.zeros(10), np.linspace(0, 1, 10))
+    assert np.isnan(scores['AUC']) and np.isnan(scores['PR_AUC'])
+    assert scores['Recall'] == 0.0 and scores['F1'] == 0.0
+
+
+def test_bootstrap_ci_matches_resample_loop():
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 2, 120)
+    y_prob = np.clip(0.3 * y_true + rng.random(120) * 0.7, 0, 1)
+    y_pred = (y_prob > 0.5).astype(int)
+    ci = bootstrap_ci(y_true, y_prob, n_boot=300, seed=7, max_elements=120 * 64)
+
+    # Same draws as the batched estimate, one sklearn call per replicate
+    indices = np.random.default_rng(7).integers(0, 120, size=(300, 120))
+    replicates = {metric: [] for metric in METRICS}
+    for rows in indices:
+        if len(np.unique(y_true[rows])) < 2:
+            continue
+        for metric, value in sklearn_metrics(y_true[rows], y_prob[rows], y_pred[rows]).items():
+            replicates[metric].append(value)
+    for metric in METRICS:
+        lower, upper = np.percentile(replicates[metric], [2.5, 97.5])
+        assert ci.loc[metric, 'lower'] == pytest.approx(lower), metric
+        assert ci.loc[metric, 'upper'] == pytest.approx(upper), metric
+        assert ci.loc[metric, 'std'] == pytest.approx(np.std(replicates[metric])), metric
+        assert ci.loc[metric, 'lower'] <= ci.loc[metric, 'estimate'] <= ci.loc[metric, 'upper'], metric
+
+
+def test_bootstrap_cell_scores_the_fitted_cell(extraction, imputer):
+    from sklearn.tree import DecisionTreeClassifier
+
+    from vap_utils.bench import bootstrap_cell, fit_predict, prepare_horizon
+    split = prepare_horizon(extraction, -1, imputer=imputer)
+    features = list(split['X_train'].columns[:4])
+    model = DecisionTreeClassifier(max_depth=3, random_state=42)
+    ci = bootstrap_cell(split, features, 'DecisionTree', model, n_boot=200)
+    y_pred, y_prob = fit_predict(model, split['X_train'][features].to_numpy(), split['y_train'],
+                                 split['X_test'][features].to_numpy())
+    expected = bootstrap_ci(split['y_test'], y_prob, y_pred, n_boot=200)
+    np.testing.assert_allclose(ci.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+    assert (ci['lower'] <= ci['estimate']).all() and (ci['estimate'] <= ci['upper']).all()
@@ -0,0 +1,66 @@
+import subprocess
+import sys
+
+import pytest
+
+import vap_utils.registry as registry
+from vap_utils.registry import MODELS, make_model, make_models
+
+# `models` dict of 02_BEST_CLASSIFIER before the registry
+NOTEBOOK_MODELS = {
+    'XGBoost': ('xgboost', 'XGBClassifier', dict(eval_metric='auc', random_state=42)),
+    'LightGBM': ('lightgbm', 'LGBMClassifier', dict(verbose=-1, random_state=42)),
+    'CatBoost': ('catboost', 'CatBoostClassifier', dict(verbose=0, random_state=42)),
+    'RandomForest': ('sklearn.ensemble', 'RandomForestClassifier', dict(random_state=42)),
+    'GradientBoosting': ('sklearn.ensemble', 'GradientBoostingClassifier', dict(random_state=42)),
+    'ExtraTrees': ('sklearn.ensemble', 'ExtraTreesClassifier', dict(random_state=42)),
+    'AdaBoost': ('sklearn.ensemble', 'AdaBoostClassifier', dict(random_state=42)),
+    'LogisticRegression': ('sklearn.linear_model', 'LogisticRegression', dict(random_state=42)),
+    'KNN': ('sklearn.neighbors', 'KNeighborsClassifier', dict()),
+    'NaiveBayes': ('sklearn.naive_bayes', 'GaussianNB', dict()),
+    'MLP': ('sklearn.neural_network', 'MLPClassifier', dict(random_state=42)),
+    'DecisionTree': ('sklearn.tree', 'DecisionTreeClassifier', dict(random_state=42)),
+}
+
+
+def test_import_does_not_load_backends():
+    code = ("import sys, vap_utils.registry\n"
+            "print(sorted(m for m in ('catboost', 'xgboost', 'lightgbm', 'sklearn') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
+
+
+def test_make_models_builds_only_the_requested_backends():
+    pytest.importorskip('catboost')
+    code = ("import sys\nfrom vap_utils.registry import make_models\nmake_models(['CatBoost', 'KNN'])\n"
+            "print(sorted(m for m in ('catboost', 'xgboost', 'lightgbm') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "['catboost']"
+
+
+@pytest.mark.parametrize('name', list(NOTEBOOK_MODELS))
+def test_models_match_the_notebook_dict(name):
+    module, class_name, params = NOTEBOOK_MODELS[name]
+    backend = pytest.importorskip(module)
+    expected = getattr(backend, class_name)(**params)
+    model = make_models([name])[name]
+    assert type(model) is type(expected)
+    assert model.get_params() == expected.get_params()
+    # Every call builds a fresh estimator
+    assert make_model(name) is not model
+
+
+def test_registry_keeps_the_notebook_order():
+    assert list(MODELS) == list(NOTEBOOK_MODELS)
+
+
+def test_missing_backend_raises_a_clear_error(monkeypatch):
+    monkeypatch.setitem(MODELS, 'Missing', ('not_installed_backend.sub', 'Classifier', {}))
+    factory = registry.model_factory('Missing')
+    with pytest.raises(ImportError, match="Model Missing needs the 'not_installed_backend' package"):
+        factory()
+
+
+def test_unknown_model_raises():
+    with pytest.raises(ValueError, match='Unknown model'):
+        make_model('SVM')
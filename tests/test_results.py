@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+
+from vap_utils.metrics import METRICS
+from vap_utils.results import ResultsTensor, summary_by_hr, summary_global, summary_pooled
+from vap_utils.store import ResultsStore
+
+SELECTORS = ['mRMR', 'SelectKBest_f', 'VarianceThreshold']
+MODELS = ['CatBoost', 'KNN']
+
+
+@pytest.fixture(scope='module')
+def nested():
+    # Curves of different lengths (rankings of different sizes) and one missing curve
+    rng = np.random.default_rng(0)
+    results = {}
+    for hr, n_features in (('hr=-1', 9), ('hr=-24', 7)):
+        results[hr] = {}
+        for s, selector in enumerate(SELECTORS):
+            results[hr][selector] = {}
+            for model in MODELS:
+                if (hr, selector, model) == ('hr=-24', 'VarianceThreshold', 'KNN'):
+                    continue
+                n_k = n_features - s
+                results[hr][selector][model] = {metric: list(rng.random(n_k)) for metric in METRICS}
+    return results
+
+
+# Loops of the 02_BEST_CLASSIFIER summaries (heatmaps_por_hr, analizar_resultados_metricas,
+# resumen_modelos_globales) before the tensor
+def loop_by_hr(results, top):
+    summary = {}
+    for hr in results:
+        mean, std = {}, {}
+        for model in MODELS:
+            mean[model], std[model] = [], []
+            for metric in METRICS:
+                scores = []
+                for selector in SELECTORS:
+                    try:
+                        scores.extend(sorted(results[hr][selector][model][metric], reverse=True)[:top])
+                    except KeyError:
+                        continue
+                mean[model].append(np.nanmean(scores))
+                std[model].append(np.nanstd(scores))
+        summary[hr] = mean, std
+    return summary
+
+
+def loop_pooled(results, top):
+    mean, std = {}, {}
+    for metric in METRICS:
+        for model in MODELS:
+            scores = []
+            for selector in SELECTORS:
+                for hr in results:
+                    try:
+                        scores.extend(sorted(results[hr][selector][model][metric], reverse=True)[:top])
+                    except KeyError:
+                        continue
+            mean.setdefault(model, []).append(np.nanmean(scores))
+            std.setdefault(model, []).append(np.nanstd(scores))
+    return mean, std
+
+
+def loop_global(results, top):
+    mean, std = {}, {}
+    for model in MODELS:
+        curve_means = {metric: [] for metric in METRICS}
+        curve_stds = {metric: [] for metric in METRICS}
+        for hr in results:
+            for selector in SELECTORS:
+                try:
+                    for metric in METRICS:
+                        top_values = sorted(results[hr][selector][model][metric], reverse=True)[:top]
+                        curve_means[metric].append(np.nanmean(top_values))
+                        curve_stds[metric].append(np.nanstd(top_values))
+                except KeyError:
+                    continue
+        mean[model] = [np.nanmean(curve_means[metric]) for metric in METRICS]
+        std[model] = [np.nanmean(curve_stds[metric]) for metric in METRICS]
+    return mean, std
+
+
+def assert_frames(df_mean, df_std, mean, std):
+    for model in MODELS:
+        np.testing.assert_allclose(df_mean.loc[model, METRICS], mean[model])
+        np.testing.assert_allclose(df_std.loc[model, METRICS], std[model])
+
+
+@pytest.mark.parametrize('top', [1, 5, 8])
+def test_summaries_match_the_notebook_loops(nested, top):
+    tensor = ResultsTensor.from_nested(nested, selectors=SELECTORS, models=MODELS, metrics=METRICS)
+    expected = loop_by_hr(nested, top)
+    for hr, (df_mean, df_std) in summary_by_hr(tensor, top=top).items():
+        assert_frames(df_mean, df_std, *expected[hr])
+    assert_frames(*summary_pooled(tensor, top=top), *loop_pooled(nested, top))
+    assert_frames(*summary_global(tensor, top=top), *loop_global(nested, top))
+
+
+def test_from_nested_pads_with_nan(nested):
+    tensor = ResultsTensor.from_nested(nested)
+    assert tensor.hrs == ['hr=-1', 'hr=-24'] and tensor.selectors == SELECTORS and tensor.models == MODELS
+    assert tensor.values.shape == (2, 3, 2, 9, len(METRICS))
+    for hr, selectors in nested.items():
+        for selector, models in selectors.items():
+            for model, values in models.items():
+                curve = tensor.curve(hr, selector, model, 'PR_AUC')
+                np.testing.assert_array_equal(curve[:len(values['PR_AUC'])], values['PR_AUC'])
+                assert np.isnan(curve[len(values['PR_AUC']):]).all()
+    assert np.isnan(tensor.sel(hr='hr=-24', selector='VarianceThreshold', model='KNN')).all()
+
+
+def test_top_values_skip_nan():
+    values = np.full((1, 1, 1, 4, 1), np.nan)
+    values[0, 0, 0, :, 0] = [0.2, np.nan, 0.9, 0.5]
+    tensor = ResultsTensor(values, ['hr=-1'], ['mRMR'], ['KNN'], ['PR_AUC'])
+    np.testing.assert_array_equal(tensor.top_values(top=2)[0, 0, 0, :, 0], [0.9, 0.5])
+    np.testing.assert_array_equal(tensor.top_values(top=4)[0, 0, 0, :, 0], [0.9, 0.5, 0.2, np.nan])
+    df_mean, _ = summary_pooled(tensor, metrics=['PR_AUC'], top=4)
+    assert df_mean.loc['KNN', 'PR_AUC'] == pytest.approx(np.mean([0.9, 0.5, 0.2]))
+
+
+def test_load_tensor_round_trip(tmp_path, nested):
+    with ResultsStore(str(tmp_path / 'results.sqlite')) as store:
+        for hr, selectors in nested.items():
+            for selector, models in selectors.items():
+                n_features = max(len(values['AUC']) for values in models.values())
+                store.add_ranking(hr, selector, [f'feature_{i}' for i in range(n_features)])
+                for model, values in models.items():
+                    for k in range(1, n_features + 1):
+                        # Cells of the adaptive sweep that were skipped are not stored
+                        if k % 3:
+                            store.add_cell(hr, selector, k, model, {metric: values[metric][k - 1]
+                                                                    for metric in METRICS})
+        tensor = store.load_tensor(columns=METRICS)
+        expected = ResultsTensor.from_nested(store.load_results(), metrics=METRICS)
+    assert tensor.labels == expected.labels
+    np.testing.assert_array_equal(tensor.values, expected.values)
+    assert np.isnan(tensor.sel(k=3)).all()
+    k_values = tensor.sel(hr='hr=-1', selector='mRMR', model='KNN', metric='AUC')
+    np.testing.assert_array_equal(k_values[[0, 1, 3]], np.asarray(nested['hr=-1']['mRMR']['KNN']['AUC'])[[0, 1, 3]])
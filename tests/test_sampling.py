@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from sklearn.utils import resample
+
+from vap_utils.sampling import balanced_bags, downsample_indices, downsampling
+
+
+def resample_downsampling(X_train, y_train, majority_proportion, random_state=42):
+    # Reference: the notebook implementation with sklearn's resample
+    X_minority, X_majority, y_majority = X_train[y_train == 1], X_train[y_train != 1], y_train[y_train != 1]
+    X_drawn, y_drawn = resample(X_majority, y_majority, replace=False,
+                                n_samples=int(len(X_minority) * majority_proportion), random_state=random_state)
+    return np.vstack((X_minority, X_drawn)), np.hstack((np.ones(len(X_minority)), y_drawn))
+
+
+@pytest.fixture(scope='module')
+def labelled():
+    rng = np.random.default_rng(0)
+    y = (rng.random(500) < 0.15).astype(int)
+    return rng.normal(size=(500, 4)), y
+
+
+@pytest.mark.parametrize('majority_proportion', [0.5, 1.0, 2.2])
+def test_downsampling_matches_resample(labelled, majority_proportion):
+    X, y = labelled
+    X_expected, y_expected = resample_downsampling(X, y, majority_proportion)
+    X_balanced, y_balanced = downsampling(X, y, majority_proportion)
+    np.testing.assert_array_equal(X_balanced, X_expected)
+    np.testing.assert_array_equal(y_balanced, y_expected)
+    assert y_balanced.dtype == y_expected.dtype
+
+
+@pytest.mark.parametrize('random_state', [0, 7])
+def test_downsample_indices_follow_random_state(labelled, random_state):
+    X, y = labelled
+    X_expected, _ = resample_downsampling(X, y, 1.0, random_state)
+    np.testing.assert_array_equal(X[downsample_indices(y, 1.0, random_state)], X_expected)
+
+
+def test_downsampling_without_proportion_keeps_every_row(labelled):
+    X, y = labelled
+    X_all, y_all = downsampling(X, y, None)
+    np.testing.assert_array_equal(X_all, X)
+    np.testing.assert_array_equal(downsample_indices(y, None), np.arange(len(y)))
+
+
+def test_balanced_bags_are_disjoint(labelled):
+    _, y = labelled
+    minority = np.flatnonzero(y == 1)
+    bags = balanced_bags(y, majority_proportion=1.0)
+    assert len(bags) == (len(y) - len(minority)) // len(minority)
+    np.testing.assert_array_equal(bags[0], downsample_indices(y, 1.0))
+    majority = [np.setdiff1d(bag, minority) for bag in bags]
+    for bag, drawn in zip(bags, majority):
+        np.testing.assert_array_equal(bag[:len(minority)], minority)
+        assert len(drawn) == len(minority) and (y[drawn] == 0).all()
+    all_drawn = np.concatenate(majority)
+    assert len(np.unique(all_drawn)) == len(all_drawn)
+
+
+def test_balanced_bags_refuse_overlapping_draws(labelled):
+    _, y = labelled
+    max_bags = len(balanced_bags(y, majority_proportion=2.0))
+    with pytest.raises(ValueError, match='disjoint'):
+        balanced_bags(y, n_bags=max_bags + 1, majority_proportion=2.0)
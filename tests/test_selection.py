@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import FunctionTransformer
+
+from vap_utils.selection import (feature_reduction_workflow, get_ranked_features, minimal_preprocess, mrmr_ranking,
+                                 stability_selection)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_mrmr_ranking_matches_mrmr_classif(seed):
+    mrmr = pytest.importorskip('mrmr')
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(300, 15)), columns=[f'feature_{i}' for i in range(15)])
+    X['feature_1'] = X['feature_0'] + 0.2 * rng.normal(size=300)
+    y = pd.Series((X['feature_0'] - X['feature_3'] + rng.normal(size=300) > 0).astype(int))
+    expected = mrmr.mrmr_classif(X=X, y=y, K=X.shape[1], show_progress=False)
+    assert mrmr_ranking(X, y, K=X.shape[1]) == expected
+    assert mrmr_ranking(X, y, K=5) == expected[:5]
+
+
+def test_mrmr_ranking_skips_irrelevant_features():
+    X = pd.DataFrame({'signal': [0., 1., 2., 3., 4., 5.], 'constant': 1.0})
+    y = pd.Series([0, 0, 0, 1, 1, 1])
+    assert mrmr_ranking(X, y) == ['signal']
+    assert get_ranked_features(X, y, 'mRMR') == ['signal']
+
+
+@pytest.fixture(scope='module')
+def reduction_data(extraction):
+    hr = extraction[extraction['hr'] == -1]
+    return hr.drop(columns=['PatientID', 'hr', 'NAV']), hr['NAV']
+
+
+@pytest.mark.parametrize('reuse_imputation', [False, True])
+def test_stability_selection_pool_matches_serial(reduction_data, imputer, reuse_imputation):
+    X, y = reduction_data
+    runs = [stability_selection(X, y, n_seeds=4, n_probes=3, imputer=imputer, reuse_imputation=reuse_imputation,
+                                n_jobs=n_jobs)
+            for n_jobs in (1, 2)]
+    assert runs[1]['runs'] == runs[0]['runs']
+    assert runs[1]['kept_features'] == runs[0]['kept_features']
+    pd.testing.assert_series_equal(runs[1]['frequencies'], runs[0]['frequencies'])
+    pd.testing.assert_series_equal(runs[1]['vt_frequencies'], runs[0]['vt_frequencies'])
+
+
+@pytest.mark.parametrize('reuse_imputation', [False, True])
+def test_single_seed_reproduces_the_workflow(reduction_data, imputer, reuse_imputation):
+    X, y = reduction_data
+    result = stability_selection(X, y, n_seeds=1, n_probes=3, seed=7, imputer=imputer,
+                                 reuse_imputation=reuse_imputation, n_jobs=1)
+    if reuse_imputation:
+        # The probes are added to the matrix imputed once, without taking part in the imputation
+        expected = feature_reduction_workflow(minimal_preprocess(X, y, imputer=imputer), y, n_probes=3, seed=7,
+                                              imputer=FunctionTransformer())
+    else:
+        expected = feature_reduction_workflow(X, y, n_probes=3, seed=7, imputer=imputer)
+    assert result['seeds'] == [7]
+    assert result['runs'] == [expected['kept_features']]
+    assert result['kept_features'] == expected['kept_features']
+    assert result['removed_by_vt'] == expected['removed_by_vt']
+    assert result['removed_by_mrmr'] == expected['removed_by_mrmr']
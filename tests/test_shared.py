@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vap_utils.shared import SharedArrays, attach, attach_split, publish_split
+
+
+def _child_split(spec):
+    split = attach_split(spec)
+    X_train = split['X_train']
+    return ({key: np.array(value) for key, value in split.items()}, list(X_train.columns),
+            X_train.to_numpy().flags.f_contiguous, X_train.to_numpy().flags.writeable)
+
+
+def _child_column_sum(spec):
+    return attach(spec)[:, :3].sum(axis=0)
+
+
+@pytest.fixture
+def split():
+    rng = np.random.default_rng(0)
+    columns = [f'feature_{i}' for i in range(6)]
+    return {'X_train': pd.DataFrame(rng.normal(size=(40, 6)), columns=columns),
+            'X_test': pd.DataFrame(rng.normal(size=(10, 6)), columns=columns),
+            'y_train': rng.integers(0, 2, 40), 'y_test': rng.integers(0, 2, 10)}
+
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_child_attaches_identical_fortran_split(split, method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f'{method} not available')
+    with SharedArrays() as shared:
+        spec = publish_split(shared, split)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(method)) as executor:
+            arrays, columns, f_contiguous, writeable = executor.submit(_child_split, spec).result()
+            np.testing.assert_array_equal(executor.submit(_child_column_sum, spec['X_train']).result(),
+                                          np.asfortranarray(split['X_train'])[:, :3].sum(axis=0))
+    assert columns == list(split['X_train'].columns)
+    assert f_contiguous and not writeable
+    for key, value in split.items():
+        expected = np.asarray(value)
+        assert arrays[key].dtype == (np.float64 if key.startswith('X') else expected.dtype)
+        # Bit-identical values
+        assert arrays[key].tobytes() == np.ascontiguousarray(expected, dtype=arrays[key].dtype).tobytes()
+
+
+def test_owner_attach_is_a_read_only_view(split):
+    with SharedArrays() as shared:
+        spec = shared.publish(split['X_train'])
+        view = attach(spec)
+        assert view.flags.f_contiguous and not view.flags.writeable
+        # Column prefixes of a Fortran matrix are views of the shared pages
+        assert np.shares_memory(view[:, :3], attach(spec))
+        with pytest.raises(ValueError):
+            view[0, 0] = 1.0
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='no /dev/shm')
+def test_blocks_are_unlinked_on_close(split):
+    with SharedArrays() as shared:
+        spec = publish_split(shared, split)
+        names = [spec[key].name for key in ('X_train', 'X_test', 'y_train', 'y_test')]
+        assert set(names) <= set(os.listdir('/dev/shm'))
+        # A view still alive in the owner does not keep the name
+        view = attach(spec['X_train'])
+    assert not set(names) & set(os.listdir('/dev/shm'))
+    assert shared.blocks == []
+    assert view.shape == (40, 6)
@@ -0,0 +1,37 @@
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from vap_utils.bench import run_experiment
+from vap_utils.metrics import METRICS
+from vap_utils.store import ResultsStore
+
+
+def test_resume_reuses_cells_and_accepts_new_models(tmp_path, extraction, imputer):
+    models = {'DecisionTree': DecisionTreeClassifier(max_depth=3, random_state=42)}
+    with ResultsStore(str(tmp_path / 'results.sqlite')) as store:
+        first, _ = run_experiment(extraction, [-1], ['SelectKBest_f'], models, store=store, imputer=imputer)
+        models['DeepTree'] = DecisionTreeClassifier(random_state=42)
+        resumed, _ = run_experiment(extraction, [-1], ['SelectKBest_f'], models, store=store, imputer=imputer)
+    for metric in METRICS:
+        assert (resumed['hr=-1']['SelectKBest_f']['DecisionTree'][metric]
+                == first['hr=-1']['SelectKBest_f']['DecisionTree'][metric])
+    assert set(resumed['hr=-1']['SelectKBest_f']) == {'DecisionTree', 'DeepTree'}
+
+
+@pytest.mark.parametrize('change', ['model', 'imputer', 'data', 'catboost_pools'])
+def test_resume_refuses_a_different_configuration(tmp_path, extraction, imputer, change):
+    models = {'DecisionTree': DecisionTreeClassifier(max_depth=3, random_state=42)}
+    options = {'imputer': imputer}
+    with ResultsStore(str(tmp_path / 'results.sqlite')) as store:
+        run_experiment(extraction, [-1], ['SelectKBest_f'], models, store=store, **options)
+        df = extraction
+        if change == 'model':
+            models = {'DecisionTree': DecisionTreeClassifier(max_depth=4, random_state=42)}
+        elif change == 'imputer':
+            options['imputer'] = type(imputer)(max_iter=20, random_state=42)
+        elif change == 'data':
+            df = extraction.assign(feature_0=extraction['feature_0'] * 2)
+        else:
+            options['catboost_pools'] = True
+        with pytest.raises(ValueError, match=change if change != 'model' else 'model:DecisionTree'):
+            run_experiment(df, [-1], ['SelectKBest_f'], models, store=store, **options)
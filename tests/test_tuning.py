@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pytest
+from optuna.pruners import BasePruner, MedianPruner
+from optuna.storages import RDBStorage
+from optuna.trial import TrialState
+from sqlalchemy import text
+
+import vap_utils.tuning as tuning
+from vap_utils.registry import make_model
+from vap_utils.tuning import (_fit_score, catboost_objective, create_study, fit_early_stopping, pool_benchmark,
+                              precompute_folds, quantize_folds, run_studies)
+
+pytest.importorskip('catboost')
+
+
+class PruneAll(BasePruner):
+    def prune(self, study, trial):
+        return True
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # CatBoost writes its catboost_info/ directory in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture(scope='module')
+def folds(extraction, imputer):
+    hr = extraction[extraction['hr'] == -1]
+    X, y = hr.drop(columns=['PatientID', 'hr', 'NAV']), hr['NAV']
+    return precompute_folds(X, y, imputer=imputer, n_jobs=1)
+
+
+def test_all_pruned_study_returns(tmp_path, folds, monkeypatch):
+    monkeypatch.setattr(tuning, 'make_pruner', lambda *args: PruneAll())
+    storage = f"sqlite:///{tmp_path / 'optuna.sqlite'}"
+    study = run_studies({'pruned': folds}, storage, n_trials=3, n_jobs=1, seed=42, pruner='median')['pruned']
+    assert [trial.state for trial in study.trials] == [TrialState.PRUNED] * 3
+
+
+def test_workers_keep_the_storage_settings(tmp_path, folds):
+    # Without heartbeat no row is written to trial_heartbeats; the default storage of
+    # `get_storage` (heartbeat every 60s) writes one per trial
+    storage = RDBStorage(f"sqlite:///{tmp_path / 'optuna.sqlite'}", heartbeat_interval=None)
+    results = run_studies({'a': folds, 'b': folds}, storage, n_trials=2, n_jobs=2, seed=42)
+    assert all(len(study.trials) == 2 for study in results.values())
+    with storage.engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM trial_heartbeats")).scalar() == 0
+    default = f"sqlite:///{tmp_path / 'default.sqlite'}"
+    run_studies({'a': folds, 'b': folds}, default, n_trials=1, n_jobs=2, seed=42)
+    with tuning.get_storage(default).engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM trial_heartbeats")).scalar() == 2
+    assert np.isfinite(max(study.best_value for study in results.values()))
+
+
+def test_fit_early_stopping_refits_on_every_row(folds):
+    fold = folds[3][0]
+    model = fit_early_stopping(make_model('CatBoost', iterations=500, learning_rate=0.3), fold['X_train'],
+                               fold['y_train'], early_stopping_rounds=20)
+    assert model.tree_count_ < 500
+    # Same model as a plain fit on all the rows with the chosen number of trees
+    expected = make_model('CatBoost', iterations=model.tree_count_, learning_rate=0.3)
+    expected.fit(fold['X_train'], fold['y_train'])
+    np.testing.assert_allclose(model.predict_proba(fold['X_valid']), expected.predict_proba(fold['X_valid']))
+
+
+@pytest.mark.parametrize('fidelity', ['folds', 'fraction'])
+def test_early_stopping_reports_one_value_per_step(tmp_path, folds, fidelity):
+    # The median pruner compares trials step by step: early stopping changes the number
+    # of trees of a fit, never the steps reported
+    study = create_study('steps', f"sqlite:///{tmp_path / 'optuna.sqlite'}", seed=42,
+                         pruner=MedianPruner(n_startup_trials=2, n_warmup_steps=0))
+    study.optimize(catboost_objective(folds, fidelity, n_rungs=3, early_stopping_rounds=20), n_trials=8)
+    assert {trial.state for trial in study.trials} <= {TrialState.COMPLETE, TrialState.PRUNED}
+    for trial in study.trials:
+        n_steps = trial.params['n_folds'] if fidelity == 'folds' else 3
+        steps = sorted(trial.intermediate_values)
+        if trial.state == TrialState.COMPLETE:
+            assert steps == list(range(n_steps))
+            assert trial.value == pytest.approx(trial.intermediate_values[n_steps - 1])
+        else:
+            assert steps == list(range(len(steps)))
+
+
+def test_pools_match_float_matrices_on_full_folds(tmp_path, folds):
+    pool_folds = quantize_folds(folds, str(tmp_path / 'pools'))
+    saved = {fold['pool']: os.path.getmtime(fold['pool']) for fold in pool_folds[3]}
+    # A second call reuses the saved pools
+    assert [fold['pool'] for fold in quantize_folds(folds, str(tmp_path / 'pools'))[3]] == list(saved)
+    assert all(os.path.getmtime(path) == mtime for path, mtime in saved.items())
+    for fold, pool_fold in zip(folds[3], pool_folds[3]):
+        rows = np.arange(len(fold['y_train']))
+        _, expected = _fit_score(fold, rows, {'iterations': 50})
+        _, pr_auc = _fit_score(pool_fold, rows, {'iterations': 50})
+        assert pr_auc == pytest.approx(expected)
+
+
+def test_pool_trials_score_close_to_float_trials(tmp_path, folds):
+    # Downsampled slices keep the borders of the whole fold: close, not identical scores
+    df = pool_benchmark(folds, n_trials=4, pool_dir=str(tmp_path / 'pools'), early_stopping_rounds=20)
+    assert len(df) == 4
+    assert (df['pr_auc_pool'] - df['pr_auc_float']).abs().mean() < 0.03
@@ -0,0 +1,39 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from vap_utils.bench import run_experiment
+from vap_utils.metrics import METRICS
+from vap_utils.store import ResultsStore
+from vap_utils.workqueue import collect, run_worker, submit
+
+
+def test_two_workers_match_run_experiment(tmp_path, extraction, models, imputer):
+    # A constant feature has no relevance: mRMR ranks one feature less than the queue's k range
+    df = extraction.assign(constant=1.0)
+    selectors = ['SelectKBest_f', 'mRMR']
+    queue_dir = str(tmp_path / 'queue')
+    n_tasks = submit(queue_dir, df, [-1, -24], selectors, models, k_chunk=3, imputer=imputer)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        completed = [future.result() for future in
+                     [executor.submit(run_worker, queue_dir, wait=True, poll=1) for _ in range(2)]]
+    assert sum(completed) == n_tasks
+
+    with ResultsStore(str(tmp_path / 'results.sqlite')) as store:
+        assert collect(queue_dir, store)['done'] == n_tasks
+        cells = store.load_cells()
+        queued = store.load_results([-1, -24], selectors, list(models))
+
+    expected, rankings = run_experiment(df, [-1, -24], selectors, models, imputer=imputer)
+    assert len(rankings['hr=-1']['mRMR']) < df.shape[1] - 3
+    n_cells = sum(len(ranking) for hr_rankings in rankings.values() for ranking in hr_rankings.values())
+    assert len(cells) == n_cells * len(models)
+    for hr_key, hr_results in expected.items():
+        for selector in selectors:
+            stored_ks = [k for hr, name, k, _ in cells if (hr, name) == (hr_key, selector)]
+            assert max(stored_ks) == len(rankings[hr_key][selector])
+            for model in models:
+                for metric in METRICS:
+                    np.testing.assert_allclose(queued[hr_key][selector][model][metric],
+                                               hr_results[selector][model][metric])
@@ -0,0 +1,983 @@
+"""
+Benchmark engine for the horizon × selector × k × model grid of 02_BEST_CLASSIFIER.
+
+Every (hr, selector, k, model) combination is an independent cell: it only needs
+the imputed/downsampled split of its horizon, the ranking of its selector and a
+fresh copy of its model. The engine prepares the splits once, computes the
+rankings and then evaluates the cells on a process pool, re-assembling the
+results in the nested layout consumed by the plotting helpers:
+
+    results[f'hr={hr}'][selector][model][metric] -> list (one value per k)
+"""
+import logging
+import os
+import pickle
+import time
+import warnings
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.experimental import enable_iterative_imputer  # noqa
+from sklearn.impute import IterativeImputer
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import MinMaxScaler
+from tqdm import tqdm
+
+from vap_utils.cache import fingerprint, fit_transform_cached
+from vap_utils.metrics import METRICS, TIMINGS, binary_metrics, bootstrap_ci
+from vap_utils.registry import load_class
+from vap_utils.sampling import downsampling
+from vap_utils.selection import get_ranked_features
+from vap_utils.shared import SharedArray, SharedArrays, attach_split, publish_split
+
+# Models that are fitted on MinMax-scaled features
+SCALED_MODELS = ['MLP', 'LogisticRegression']
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS measurement
+    resource = None
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # BLAS / OpenMP pools are then only limited through the environment variables
+    threadpool_limits = None
+
+# Environment variables read by BLAS / OpenMP runtimes loaded after the limit is set
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                   'NUMEXPR_NUM_THREADS']
+
+
+def _horizon_data(df, hr):
+    df_hr = df[df['hr'] == hr]
+    df_hr = df_hr.drop(columns=['PatientID', 'hr'], axis=1).reset_index(drop=True)
+    return df_hr.drop(columns=['NAV'], axis=1), df_hr['NAV']
+
+
+def _impute_and_downsample(X, X_train, X_test, y_train, y_test, imputer_cache, imputer):
+    columns = list(X.columns)
+    imputer = IterativeImputer(max_iter=1000, random_state=42) if imputer is None else clone(imputer)
+    _, X_train, X_test = fit_transform_cached(imputer, X_train, X_test, cache_dir=imputer_cache)
+    X_train = pd.DataFrame(X_train, columns=X.columns)
+    X_test = pd.DataFrame(X_test, columns=X.columns)
+
+    X_train, y_train = downsampling(X_train.values, y_train, majority_proportion=1.0)
+    X_train = pd.DataFrame(X_train, columns=columns)
+
+    return {'X_train': X_train, 'y_train': y_train, 'X_test': X_test, 'y_test': np.asarray(y_test)}
+
+
+def prepare_horizon(df, hr, imputer_cache=None, imputer=None):
+    """
+    Builds the train/test split of one horizon: 80/20 stratified split,
+    iterative imputation fitted on train and downsampling of the majority class.
+    `imputer` (unfitted) replaces the default IterativeImputer(max_iter=1000, random_state=42),
+    e.g. a FastIterativeImputer; `imputer_cache` is a directory for `fit_transform_cached`.
+
+    Returns:
+    dict: X_train / X_test (DataFrames) and y_train / y_test (numpy arrays).
+    """
+    X, y = _horizon_data(df, hr)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    return _impute_and_downsample(X, X_train, X_test, y_train, y_test, imputer_cache, imputer)
+
+
+def prepare_fold(df, hr, fold, n_splits=5, imputer_cache=None, imputer=None):
+    """
+    Builds the split of fold `fold` of a stratified K-fold (shuffled, random_state=42)
+    of one horizon, with the same per-split imputation and downsampling as
+    `prepare_horizon`. With `imputer_cache`, fold imputations are reused between runs.
+
+    Returns:
+    dict: X_train / X_test (DataFrames) and y_train / y_test (numpy arrays).
+    """
+    X, y = _horizon_data(df, hr)
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42).split(X, y)
+    train_index, test_index = list(folds)[fold]
+    return _impute_and_downsample(X, X.iloc[train_index], X.iloc[test_index], y.iloc[train_index],
+                                  y.iloc[test_index], imputer_cache, imputer)
+
+
+def split_key(hr, fold=None):
+    """Key of a split in results and stores: 'hr=-24' (hold-out) or 'hr=-24/fold=2' (cv)."""
+    return f'hr={hr}' if fold is None else f'hr={hr}/fold={fold}'
+
+
+def fit_predict(model, X_train, y_train, X_test):
+    """Fits a fresh clone of `model` and returns its (labels, positive-class probabilities) on X_test."""
+    model = clone(model)
+    model.fit(X_train, y_train)
+    return model.predict(X_test), model.predict_proba(X_test)[:, 1]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return np.nan
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if os.uname().sysname == 'Darwin' else peak / 2 ** 10
+
+
+def score_model(model, X_train, y_train, X_test, y_test, model_size=False):
+    """
+    Fits a fresh clone of `model` on (X_train, y_train) and scores it on the test set.
+    A failing fit yields NaN for every metric.
+
+    Besides METRICS, the result holds the TIMINGS of the cell: fit, predict and metric
+    seconds, the growth of the process peak RSS during the fit and predict (MB, 0 when
+    the cell stays below an earlier peak of the worker) and, with `model_size`, the
+    pickled model size (bytes; NaN otherwise, pickling every model is not free).
+
+    Returns:
+    dict: metric / measurement name -> value.
+    """
+    timings = {column: np.nan for column in TIMINGS}
+    try:
+        peak_before = _peak_rss_mb()
+        start = time.perf_counter()
+        model = clone(model)
+        model.fit(X_train, y_train)
+        timings['fit_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        y_pred_prob = model.predict_proba(X_test)[:, 1]
+        timings['predict_seconds'] = time.perf_counter() - start
+        timings['peak_rss_mb'] = _peak_rss_mb() - peak_before
+        if model_size:
+            timings['model_bytes'] = len(pickle.dumps(model))
+
+        start = time.perf_counter()
+        scores = binary_metrics(y_test, y_pred_prob, y_pred)
+        timings['metric_seconds'] = time.perf_counter() - start
+        return {**scores, **timings}
+    except Exception:
+        return {**{metric: np.nan for metric in METRICS}, **timings}
+
+
+def _selected_arrays(split, selected_features, model_name):
+    X_train_selected = split['X_train'][selected_features]
+    X_test_selected = split['X_test'][selected_features]
+
+    if model_name in SCALED_MODELS:
+        scaler = MinMaxScaler()
+        X_train_selected = scaler.fit_transform(X_train_selected)
+        X_test_selected = scaler.transform(X_test_selected)
+    return X_train_selected, X_test_selected
+
+
+def evaluate_cell(split, selected_features, model_name, model):
+    """
+    Fits a fresh clone of `model` on the selected features of `split` and scores it
+    on the test set. A failing fit yields NaN for every metric.
+
+    Returns:
+    dict: metric name -> value.
+    """
+    X_train_selected, X_test_selected = _selected_arrays(split, selected_features, model_name)
+    return score_model(model, X_train_selected, split['y_train'], X_test_selected, split['y_test'])
+
+
+def bootstrap_cell(split, selected_features, model_name, model, n_boot=2000, alpha=0.05, seed=42):
+    """
+    Fits one grid cell like `evaluate_cell` and returns bootstrap confidence intervals of
+    its test metrics (`bootstrap_ci`), e.g. for the best (selector, k, model) of a horizon.
+
+    Returns:
+    pd.DataFrame: estimate / lower / upper / std for every metric.
+    """
+    X_train_selected, X_test_selected = _selected_arrays(split, selected_features, model_name)
+    y_pred, y_pred_prob = fit_predict(model, X_train_selected, split['y_train'], X_test_selected)
+    return bootstrap_ci(split['y_test'], y_pred_prob, y_pred, n_boot=n_boot, alpha=alpha, seed=seed)
+
+
+def build_grid(ranked_features, models):
+    """
+    Lists the (hr, selector, k, model) cells in the order of a serial run.
+    """
+    return [
+        (hr, selector_name, k, model_name)
+        for hr, rankings in ranked_features.items()
+        for selector_name, ranking in rankings.items()
+        for k in range(1, len(ranking) + 1)
+        for model_name in models
+    ]
+
+
+# ==== Worker side ====
+# Splits are published once in shared memory and attached by the workers without a
+# copy; models are shipped once per worker through the pool initializer. Tasks only
+# carry names, a column order and the columns to use, as column positions.
+_WORKER = {}
+
+
+def _init_worker(splits, models, threads=None, catboost_pools=False, model_size=False):
+    # splits: hr key -> split dict, or its `publish_split` descriptors
+    _WORKER['splits'] = {hr: attach_split(split) if isinstance(split['X_train'], SharedArray) else split
+                         for hr, split in splits.items()}
+    _WORKER['models'] = models
+    _WORKER['threads'] = threads
+    _WORKER['catboost_pools'] = catboost_pools
+    _WORKER['model_size'] = model_size
+    limit_threads(threads)
+    _clear_caches()
+
+
+def _clear_caches():
+    _ordered_arrays.cache_clear()
+    _scaled_arrays.cache_clear()
+    _catboost_pool.cache_clear()
+
+
+@lru_cache(maxsize=4)
+def _ordered_arrays(hr, order):
+    """
+    Train/test matrices of `hr` with their columns in `order` (column positions, usually
+    a ranking), as Fortran-ordered float arrays: the first k columns X[:, :k] are a
+    contiguous view. The split's own column order returns the (shared) matrices as they
+    are, without a copy. Grid tasks arrive grouped by selector, so a small cache covers
+    consecutive tasks.
+    """
+    split = _WORKER['splits'][hr]
+    arrays = []
+    for key in ('X_train', 'X_test'):
+        X = split[key].to_numpy(dtype=np.float64)
+        if order != tuple(range(X.shape[1])):
+            X = X[:, list(order)]
+        arrays.append(np.asfortranarray(X))
+    return tuple(arrays)
+
+
+@lru_cache(maxsize=4)
+def _scaled_arrays(hr, order):
+    # MinMax scaling is per column: scaling once and slicing equals fitting on the slice
+    X_train, X_test = _ordered_arrays(hr, order)
+    scaler = MinMaxScaler().fit(X_train)
+    return np.asfortranarray(scaler.transform(X_train)), np.asfortranarray(scaler.transform(X_test))
+
+
+@lru_cache(maxsize=4)
+def _catboost_pool(hr, order):
+    """
+    Quantized CatBoost Pool of the training matrix of `hr` with its columns in `order`,
+    built once per worker and shared by every CatBoost cell of the curve: each cell
+    trains on it with the unused columns ignored instead of quantizing X[:, :k] again.
+    """
+    X_train, _ = _ordered_arrays(hr, order)
+    pool = load_class('catboost', 'Pool')(X_train, label=_WORKER['splits'][hr]['y_train'])
+    pool.quantize()
+    return pool
+
+
+def _init_prepare_worker(df, n_splits, imputer_cache, imputer, threads=None):
+    _WORKER['df'] = df
+    limit_threads(threads)
+    _WORKER['prepare_args'] = (n_splits, imputer_cache, imputer)
+
+
+def _prepare_task(task):
+    hr, fold = task
+    n_splits, imputer_cache, imputer = _WORKER['prepare_args']
+    if fold is None:
+        return prepare_horizon(_WORKER['df'], hr, imputer_cache, imputer)
+    return prepare_fold(_WORKER['df'], hr, fold, n_splits, imputer_cache, imputer)
+
+
+def _rank_task(task):
+    hr, selector_name = task
+    split = _WORKER['splits'][hr]
+    start = time.perf_counter()
+    ranking = get_ranked_features(split['X_train'], split['y_train'], selector_name, n_jobs=_WORKER.get('threads'))
+    return ranking, time.perf_counter() - start
+
+
+def _cell_task(task):
+    # order: column positions of the ranking; columns: k (prefix view of the ordered
+    # matrices) or a tuple of positions in that order
+    hr, model_name, order, columns = task
+    split = _WORKER['splits'][hr]
+    model = _WORKER['models'][model_name]
+    if _WORKER.get('catboost_pools') and _is_catboost(model):
+        used = range(columns) if isinstance(columns, int) else columns
+        ignored = sorted(set(range(len(order))) - set(used))
+        model = clone(model)
+        if ignored:
+            model.set_params(ignored_features=ignored)
+        # Labels are inside the pool; the model predicts on the float test matrix
+        return score_model(model, _catboost_pool(hr, order), None, _ordered_arrays(hr, order)[1], split['y_test'],
+                           _WORKER['model_size'])
+    if model_name in SCALED_MODELS:
+        X_train, X_test = _scaled_arrays(hr, order)
+    else:
+        X_train, X_test = _ordered_arrays(hr, order)
+    if isinstance(columns, int):
+        X_train, X_test = X_train[:, :columns], X_test[:, :columns]
+    else:
+        X_train, X_test = X_train[:, list(columns)], X_test[:, list(columns)]
+    return score_model(model, X_train, split['y_train'], X_test, split['y_test'], _WORKER['model_size'])
+
+
+def model_fingerprint(model_name, model):
+    """
+    Identifies a model by name and parameters. The fit memo keys a cell by
+    (model fingerprint, selected features, split fingerprint).
+    """
+    params = sorted((name, repr(value)) for name, value in model.get_params().items())
+    return fingerprint(model_name, params)
+
+
+def experiment_config(df, models, imputer=None, memoize=True, catboost_pools=False, cv=False, n_splits=5):
+    """
+    Fingerprints of everything besides (hr, selector, k, model) that changes the scores
+    of a cell, checked by `ResultsStore.check_config` before a run resumes from a store:
+    the extraction, the imputer, every model with its parameters, the column order of
+    `memoize='set'`, `catboost_pools` and, with cv=True, the number of folds.
+
+    Returns:
+    dict: entry name -> fingerprint (one 'model:<name>' entry per model).
+    """
+    imputer = IterativeImputer(max_iter=1000, random_state=42) if imputer is None else imputer
+    config = {
+        'data': fingerprint(list(df.columns), pd.util.hash_pandas_object(df, index=True).to_numpy()),
+        'imputer': fingerprint(type(imputer).__name__, sorted(imputer.get_params(deep=True).items())),
+        'feature_order': 'split' if memoize == 'set' else 'ranking',
+        'catboost_pools': bool(catboost_pools),
+    }
+    if cv:
+        config['n_splits'] = n_splits
+    config.update({f'model:{model_name}': model_fingerprint(model_name, model) for model_name, model in models.items()})
+    return config
+
+
+def n_workers(n_jobs):
+    """Resolves a joblib-style `n_jobs` (None, -1, positive int) to a number of processes."""
+    n_cpus = os.cpu_count() or 1
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, n_cpus + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def _is_catboost(model):
+    return type(model).__name__.startswith('CatBoost')
+
+
+# ==== Thread budget ====
+def _thread_param(model):
+    """Name of the parameter setting the number of threads of `model` (None if single-threaded)."""
+    if _is_catboost(model):
+        # CatBoost's get_params only lists the parameters that were set explicitly
+        return 'thread_count'
+    params = model.get_params()
+    for name in ('n_jobs', 'nthread', 'thread_count'):
+        if name in params:
+            return name
+    return None
+
+
+def thread_budget(n_jobs, threads_per_worker=None, n_cpus=None):
+    """
+    Splits the cores between worker processes and the threads of each worker, so that
+    workers × threads does not exceed the machine (nested parallelism oversubscribes
+    quickly: every boosting library and BLAS start one thread per core by default).
+
+    Parameters:
+    n_jobs (int or None): Requested worker processes (joblib style, see `n_workers`).
+    threads_per_worker (int or None): Threads of every worker. None gives each worker an
+        equal share of the cores.
+    n_cpus (int or None): Core budget (default os.cpu_count()).
+
+    Returns:
+    tuple: (workers, threads_per_worker). With an explicit `threads_per_worker` the
+        number of workers is reduced so that the product fits in the budget.
+    """
+    n_cpus = n_cpus or os.cpu_count() or 1
+    workers = min(n_workers(n_jobs), n_cpus)
+    if threads_per_worker is None:
+        return workers, max(1, n_cpus // workers)
+    threads_per_worker = max(1, min(threads_per_worker, n_cpus))
+    return max(1, min(workers, n_cpus // threads_per_worker)), threads_per_worker
+
+
+def with_threads(models, threads):
+    """
+    Returns clones of `models` set to use `threads` threads (CatBoost `thread_count`,
+    XGBoost / LightGBM / sklearn `n_jobs`, `nthread`). Single-threaded models are
+    returned as plain clones. None leaves the library defaults.
+    """
+    threaded = {}
+    for model_name, model in models.items():
+        model = clone(model)
+        param = _thread_param(model)
+        if threads is not None and param is not None:
+            model.set_params(**{param: threads})
+        threaded[model_name] = model
+    return threaded
+
+
+def limit_threads(threads):
+    """
+    Caps the BLAS / OpenMP thread pools of the current process at `threads` (through
+    threadpoolctl for the libraries already loaded and the environment variables for
+    those imported later, e.g. the lazily imported boosting backends). None is a no-op.
+    """
+    if threads is None:
+        return
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    if threadpool_limits is not None:
+        # Kept referenced: the limit holds for the lifetime of the worker (or, in the
+        # current process, until `make_executor` restores it)
+        _WORKER['thread_limits'] = threadpool_limits(limits=threads)
+
+
+@contextmanager
+def make_executor(n_jobs, initargs, initializer=_init_worker):
+    """
+    Context manager yielding a process pool whose workers are initialised with
+    `initializer(*initargs)` (shut down on exit), or None when a single process is
+    requested. The current process is then initialised for the duration of the block
+    only: on exit its thread limits and environment variables are restored and the
+    worker state (splits, models, cached matrices) is released.
+    """
+    n_proc = n_workers(n_jobs)
+    if n_proc > 1:
+        with ProcessPoolExecutor(max_workers=n_proc, initializer=initializer, initargs=initargs) as executor:
+            yield executor
+        return
+
+    environ = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    try:
+        initializer(*initargs)
+        yield None
+    finally:
+        thread_limits = _WORKER.pop('thread_limits', None)
+        if thread_limits is not None:
+            thread_limits.restore_original_limits()
+        for name, value in environ.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        _WORKER.clear()
+        _clear_caches()
+
+
+def _imap(executor, func, tasks, n_proc=1, desc=None):
+    """
+    Runs `func` over `tasks`, yielding the outputs in task order as they come in.
+    `n_proc` is the number of workers of `executor`, which sets the chunk size.
+    """
+    if executor is None:
+        outputs = map(func, tasks)
+    else:
+        chunksize = max(1, len(tasks) // (n_proc * 8))
+        outputs = executor.map(func, tasks, chunksize=chunksize)
+    yield from tqdm(outputs, total=len(tasks), desc=desc)
+
+
+def coarse_k_grid(n_features, k_step):
+    """Coarse k values of the adaptive sweep: 1, 1 + k_step, ... and always n_features."""
+    ks = list(range(1, n_features + 1, k_step))
+    if ks[-1] != n_features:
+        ks.append(n_features)
+    return ks
+
+
+def adaptive_sweep(curves, evaluate, k_step=5, patience=3, metric='PR_AUC'):
+    """
+    Adaptive k-sweep of several (hr, selector, model) curves at once.
+
+    1) Coarse pass: every curve walks its `coarse_k_grid` in increasing k, one point per
+       round, and stops once `metric` has not improved on its best value for `patience`
+       consecutive points. A round evaluates the next point of every active curve.
+    2) Refinement: every k within k_step - 1 of the best coarse point is evaluated.
+
+    Parameters:
+    curves (dict): (hr, selector, model) -> number of ranked features.
+    evaluate (callable): Takes a list of (hr, selector, k, model) cells, returns a dict
+        cell -> scores (metric -> value).
+    k_step (int): Stride of the coarse grid.
+    patience (int): Coarse points without improvement before a curve stops.
+    metric (str): Metric driving the early stop and the refinement (NaN counts as worst).
+
+    Returns:
+    dict: (hr, selector, k, model) -> scores for every evaluated cell.
+    """
+    def value(cell_scores):
+        return -np.inf if np.isnan(cell_scores[metric]) else cell_scores[metric]
+
+    scores = {}
+    grids = {curve: coarse_k_grid(n_features, k_step) for curve, n_features in curves.items() if n_features > 0}
+    position = {curve: 0 for curve in grids}
+    best = {curve: (-np.inf, None) for curve in grids}  # (score, k)
+    since_best = {curve: 0 for curve in grids}
+    active = list(grids)
+
+    # 1) Coarse pass
+    while active:
+        cells = [(hr, selector, grids[(hr, selector, model)][position[(hr, selector, model)]], model)
+                 for hr, selector, model in active]
+        scores.update(evaluate(cells))
+        still_active = []
+        for (hr, selector, k, model) in cells:
+            curve = (hr, selector, model)
+            score = value(scores[(hr, selector, k, model)])
+            if best[curve][1] is None or score > best[curve][0]:
+                best[curve] = (score, k)
+                since_best[curve] = 0
+            else:
+                since_best[curve] += 1
+            position[curve] += 1
+            if since_best[curve] < patience and position[curve] < len(grids[curve]):
+                still_active.append(curve)
+        active = still_active
+
+    # 2) Refinement around the best coarse point
+    cells = [(hr, selector, k, model)
+             for (hr, selector, model), (_, best_k) in best.items()
+             for k in range(max(1, best_k - k_step + 1), min(curves[(hr, selector, model)], best_k + k_step - 1) + 1)
+             if (hr, selector, k, model) not in scores]
+    scores.update(evaluate(cells))
+    return scores
+
+
+def successive_halving(curves, evaluate, eta=3, min_points=4, metric='PR_AUC'):
+    """
+    Successive-halving race between the (selector, model) candidates of every horizon.
+
+    Round r evaluates every surviving candidate on min_points * eta**r k values spread
+    evenly over 1..N (cells of earlier rounds are reused). Candidates are ranked by their
+    best `metric` so far and only the top 1/eta of each horizon is promoted. The race
+    ends when one candidate per horizon is left or the budget covers every k; the
+    survivors are then evaluated on the full k = 1..N sweep.
+
+    Parameters:
+    curves (dict): (hr, selector, model) -> number of ranked features.
+    evaluate (callable): Takes a list of (hr, selector, k, model) cells, returns a dict
+        cell -> scores (metric -> value).
+    eta (int): Promotion rate (the top ceil(n / eta) candidates survive a round).
+    min_points (int): Number of k values of the first round.
+    metric (str): Metric the candidates are ranked by (NaN counts as worst).
+
+    Returns:
+    tuple: (scores, race_log) with scores (hr, selector, k, model) -> scores for every
+        evaluated cell and race_log a DataFrame with one row per candidate: hr, selector,
+        model, round it was eliminated in (or reached the final in), status ('eliminated'
+        or 'finalist'), number of k values evaluated, best k and best `metric`.
+    """
+    def k_values(n_features, n_points):
+        if n_points is None or n_points >= n_features:
+            return list(range(1, n_features + 1))
+        return sorted(set(np.linspace(1, n_features, n_points).round().astype(int).tolist()))
+
+    def best(curve):
+        hr, selector, model = curve
+        evaluated = [(k, scores[(hr, selector, k, model)][metric]) for k in range(1, curves[curve] + 1)
+                     if (hr, selector, k, model) in scores]
+        evaluated = [(k, value) for k, value in evaluated if not np.isnan(value)]
+        if not evaluated:
+            return None, -np.inf
+        return max(evaluated, key=lambda item: item[1])
+
+    def log_entry(curve, race_round, status):
+        best_k, best_value = best(curve)
+        n_evaluated = sum((curve[0], curve[1], k, curve[2]) in scores for k in range(1, curves[curve] + 1))
+        return {'hr': curve[0], 'selector': curve[1], 'model': curve[2], 'round': race_round, 'status': status,
+                'n_k': n_evaluated, 'best_k': best_k, f'best_{metric}': np.nan if best_k is None else best_value}
+
+    scores = {}
+    race_log = []
+    alive = defaultdict(list)
+    for curve, n_features in curves.items():
+        if n_features > 0:
+            alive[curve[0]].append(curve)
+
+    n_points = min_points
+    race_round = 0
+    while True:
+        final = (all(len(candidates) <= 1 for candidates in alive.values())
+                 or all(n_points >= curves[curve] for candidates in alive.values() for curve in candidates))
+        cells = [(hr, selector, k, model)
+                 for candidates in alive.values()
+                 for hr, selector, model in candidates
+                 for k in k_values(curves[(hr, selector, model)], None if final else n_points)]
+        scores.update(evaluate(cells))
+        if final:
+            race_log.extend(log_entry(curve, race_round, 'finalist')
+                            for candidates in alive.values() for curve in candidates)
+            break
+
+        for hr, candidates in alive.items():
+            ranked = sorted(candidates, key=lambda curve: best(curve)[1], reverse=True)
+            n_keep = int(np.ceil(len(ranked) / eta))
+            race_log.extend(log_entry(curve, race_round, 'eliminated') for curve in ranked[n_keep:])
+            alive[hr] = ranked[:n_keep]
+        n_points *= eta
+        race_round += 1
+
+    return scores, pd.DataFrame(race_log)
+
+
+# Experiment runner with multiple metrics
+def run_experiment(df, hr_list, selector_names, models, cv=False, n_jobs=1, store=None, imputer_cache=None,
+                   imputer=None, k_strategy='full', k_step=5, patience=3, eta=3, memoize=True, n_splits=5,
+                   threads_per_worker=None, catboost_pools=False, model_size=False):
+    """
+    Evaluates every (hr, selector, k, model) cell of the benchmark grid.
+
+    Parameters:
+    df (pd.DataFrame): Extraction with 'PatientID', 'hr', 'NAV' and the feature columns.
+    hr_list (list): Horizons to evaluate (e.g. [-1, -24, -48]).
+    selector_names (list): Names understood by `get_ranked_features`.
+    models (dict): Model name -> unfitted estimator; each cell fits its own clone.
+    cv (bool): False evaluates the 80/20 hold-out split; True runs a stratified K-fold
+        (`prepare_fold`) with its own imputation, downsampling and rankings per fold.
+        Folds are prepared and evaluated on the process pool like the grid cells, and
+        are stored under the keys 'hr=-24/fold=0', 'hr=-24/fold=1', ...
+    n_jobs (int or None): Number of worker processes (-1 = all cores, 1 = serial).
+    store (ResultsStore or None): If given, rankings and cells already in the store are
+        reused and every new cell is appended to it as soon as it completes. A store
+        written with a different `experiment_config` (data, imputer, model parameters,
+        memoize='set', catboost_pools, n_splits) raises a ValueError.
+    imputer_cache (str or None): Directory of the fitted-imputer cache (None refits).
+    imputer (estimator or None): Unfitted imputer replacing the default IterativeImputer.
+    k_strategy (str): 'full' evaluates every k = 1..N; 'adaptive' runs `adaptive_sweep`
+        (coarse grid with early stop on PR_AUC, then refinement around the best k);
+        'race' runs `successive_halving` between the (selector, model) candidates.
+    k_step (int): Coarse stride of the adaptive sweep.
+    patience (int): Coarse points without PR_AUC improvement before a curve stops.
+    eta (int): Promotion rate of the race (top 1/eta of the candidates survive a round).
+    memoize (bool or str): Share fits between cells with the same model, split and
+        selected features (e.g. the identical SelectKBest_f / GenericUnivariateSelect
+        rankings). True matches the ordered feature list, so scores are unchanged. 'set'
+        matches the feature set and passes the features in the column order of the split,
+        which also shares equal prefixes ranked in a different order but changes the scores
+        of models sensitive to column order (RandomForest, ExtraTrees...). False disables it.
+        The number of cells served from the memo is logged at the end of the run.
+    n_splits (int): Number of folds when cv=True.
+    threads_per_worker (int or None): Threads of every worker (model `thread_count` /
+        `n_jobs` / `nthread`, model-based rankings, mutual information, BLAS). None splits
+        the cores evenly between the workers (`thread_budget`); a serial run then keeps the
+        library defaults. An explicit value reduces the number of workers if needed so that
+        workers × threads fits in the cores.
+    catboost_pools (bool): Fit the CatBoost cells on a quantized Pool built once per
+        (split, ranking) in every worker, with the columns after k passed as
+        `ignored_features`, instead of a float matrix that CatBoost quantizes again in
+        every cell. Off by default: scores may differ slightly from float-matrix fits, so
+        do not mix both modes in one store.
+    model_size (bool): Also record the pickled size of every fitted model ('model_bytes',
+        NaN otherwise), at the cost of pickling every model of the grid.
+
+    Returns:
+    tuple: (results, ranked_features) with
+        results[f'hr={hr}'][selector][model][metric] -> list over k = 1..N and
+        ranked_features[f'hr={hr}'][selector] -> ranked list of features.
+        With k_strategy='adaptive' or 'race' the k values that were not evaluated are NaN.
+        With k_strategy='race' a third element, the race log of `successive_halving`, is returned.
+        With cv=True, results[f'hr={hr}'][selector][model][metric] is the mean over folds,
+        results[...][f'{metric}_folds'] -> list over k of the per-fold values, and
+        ranked_features[f'hr={hr}'][selector] -> list of the per-fold rankings
+        (k is the number of top features of each fold's own ranking).
+        Results are identical whatever the value of `n_jobs`.
+    """
+    if k_strategy not in ('full', 'adaptive', 'race'):
+        raise ValueError(f"Unknown k_strategy: {k_strategy!r} (expected 'full', 'adaptive' or 'race').")
+    if cv and k_strategy != 'full':
+        raise ValueError("cv=True only supports k_strategy='full'.")
+
+    # Split key -> (hr, fold); every fold is handled as a horizon of its own until the end
+    folds = range(n_splits) if cv else [None]
+    horizons = {split_key(hr, fold): (hr, fold) for hr in hr_list for fold in folds}
+    ranked_features = {hr_key: {} for hr_key in horizons}
+    scores = {}
+    if store is not None:
+        store.check_config(experiment_config(df, models, imputer, memoize, catboost_pools, cv, n_splits))
+        scores = store.load_cells()
+        for hr_key in horizons:
+            for selector_name in selector_names:
+                ranking = store.get_ranking(hr_key, selector_name)
+                if ranking is not None:
+                    ranked_features[hr_key][selector_name] = ranking
+
+    def is_pending(hr_key):
+        if len(ranked_features[hr_key]) < len(selector_names):
+            return True
+        return any(cell not in scores for cell in build_grid({hr_key: ranked_features[hr_key]}, models))
+
+    # Splits whose rankings and cells are all stored are not imputed again
+    prepare_tasks = [(hr_key, horizons[hr_key]) for hr_key in horizons if is_pending(hr_key)]
+    n_proc, threads = thread_budget(n_jobs, threads_per_worker)
+    if n_proc == 1 and threads_per_worker is None:
+        threads = None
+    logger.info("[run_experiment] %d worker(s) x %s thread(s)", n_proc, threads or "default")
+
+    splits = {}
+    if prepare_tasks:
+        n_prepare, prepare_threads = thread_budget(min(n_proc, len(prepare_tasks)), threads_per_worker)
+        if n_prepare == 1 and threads_per_worker is None:
+            prepare_threads = None
+        prepare_args = (df, n_splits, imputer_cache, imputer, prepare_threads)
+        with make_executor(n_prepare, prepare_args, _init_prepare_worker) as executor:
+            tasks = [task for _, task in prepare_tasks]
+            outputs = _imap(executor, _prepare_task, tasks, n_prepare, desc="splits")
+            for (hr_key, _), split in zip(prepare_tasks, outputs):
+                splits[hr_key] = split
+    with ExitStack() as stack:
+        shared = stack.enter_context(SharedArrays())
+        # Worker processes attach to one shared copy of the split matrices
+        worker_splits = splits if n_proc == 1 else {hr_key: publish_split(shared, split)
+                                                    for hr_key, split in splits.items()}
+        worker_args = (worker_splits, with_threads(models, threads), threads, catboost_pools, model_size)
+        executor = stack.enter_context(make_executor(n_proc, worker_args))
+
+        # 1) Rankings, one task per (hr, selector)
+        rank_tasks = [(hr_key, selector_name) for hr_key in splits for selector_name in selector_names
+                      if selector_name not in ranked_features[hr_key]]
+        for (hr_key, selector_name), (ranking, seconds) in zip(rank_tasks, _imap(executor, _rank_task, rank_tasks,
+                                                                                  n_proc, desc="rankings")):
+            ranked_features[hr_key][selector_name] = list(ranking)
+            logger.info("[run_experiment] ranking %s %s: %.2fs", hr_key, selector_name, seconds)
+            if store is not None:
+                store.add_ranking(hr_key, selector_name, ranking, seconds)
+        ranked_features = {hr_key: {selector_name: ranked_features[hr_key][selector_name]
+                                    for selector_name in selector_names}
+                           for hr_key in horizons}
+
+        # 2) Grid cells, one task per (hr, selector, k, model) or, with the memo,
+        #    one task per distinct (model, feature set, split)
+        columns = {hr_key: list(split['X_train'].columns) for hr_key, split in splits.items()}
+        split_keys = {hr_key: fingerprint(*split.values()) for hr_key, split in splits.items()}
+        model_keys = {model_name: model_fingerprint(model_name, model) for model_name, model in models.items()}
+        positions = {hr_key: {column: i for i, column in enumerate(hr_columns)} for hr_key, hr_columns in columns.items()}
+        orders = {}
+
+        def ranking_order(hr_key, selector_name):
+            # Ranking as column positions of the split, shared by every cell of the curve
+            if (hr_key, selector_name) not in orders:
+                orders[hr_key, selector_name] = tuple(positions[hr_key][column]
+                                                      for column in ranked_features[hr_key][selector_name])
+            return orders[hr_key, selector_name]
+
+        def cell_features(cell):
+            hr_key, selector_name, k, _ = cell
+            selected = ranked_features[hr_key][selector_name][:k]
+            if memoize == 'set':
+                selected = set(selected)
+                return [column for column in columns[hr_key] if column in selected]
+            return selected
+
+        def cell_task(cell):
+            # Prefix of the ranking-ordered matrices, or positions in the split's column order
+            hr_key, selector_name, k, model_name = cell
+            if memoize == 'set':
+                selected = sorted(ranking_order(hr_key, selector_name)[:k])
+                return hr_key, model_name, tuple(range(len(columns[hr_key]))), tuple(selected)
+            return hr_key, model_name, ranking_order(hr_key, selector_name), k
+
+        def cell_key(cell):
+            hr_key, _, _, model_name = cell
+            features = cell_features(cell)
+            features = frozenset(features) if memoize == 'set' else tuple(features)
+            return model_keys[model_name], features, split_keys[hr_key]
+
+        memo = {}
+        if memoize:
+            # Cells of an earlier run against the same store also feed the memo
+            for cell, cell_scores in scores.items():
+                if cell[0] in splits and cell[1] in ranked_features[cell[0]] and cell[3] in models:
+                    memo.setdefault(cell_key(cell), cell_scores)
+        memo_stats = {'cells': 0, 'hits': 0}
+
+        def evaluate(cells, desc="grid"):
+            new_cells = [cell for cell in cells if cell not in scores]
+            if memoize:
+                keys = [cell_key(cell) for cell in new_cells]
+                # First cell of every key not seen yet, in grid order
+                first = {}
+                for cell, key in zip(new_cells, keys):
+                    if key not in memo and key not in first:
+                        first[key] = cell
+                fit_cells = list(first.values())
+            else:
+                fit_cells = new_cells
+            cell_tasks = [cell_task(cell) for cell in fit_cells]
+            fitted = {}
+            for cell, cell_scores in zip(fit_cells, _imap(executor, _cell_task, cell_tasks, n_proc, desc=desc)):
+                fitted[cell] = cell_scores
+                if memoize:
+                    memo[cell_key(cell)] = cell_scores
+
+            for i, cell in enumerate(new_cells):
+                if not memoize or cell in fitted:
+                    scores[cell] = memo[keys[i]] if memoize else fitted[cell]
+                else:
+                    # Served from the memo: same scores, no fit to measure
+                    scores[cell] = {**memo[keys[i]], **{column: np.nan for column in TIMINGS}}
+                if store is not None:
+                    store.add_cell(*cell, scores[cell])
+            memo_stats['cells'] += len(new_cells)
+            memo_stats['hits'] += len(new_cells) - len(fit_cells)
+            return {cell: scores[cell] for cell in cells}
+
+        curves = {(hr_key, selector_name, model_name): len(ranked_features[hr_key][selector_name])
+                  for hr_key in horizons for selector_name in selector_names for model_name in models}
+        race_log = None
+        if k_strategy == 'full':
+            evaluate(build_grid(ranked_features, models))
+        elif k_strategy == 'adaptive':
+            adaptive_sweep(curves, lambda cells: evaluate(cells, desc="k-sweep"), k_step=k_step, patience=patience)
+        else:
+            _, race_log = successive_halving(curves, lambda cells: evaluate(cells, desc="race"), eta=eta)
+
+    if memoize and memo_stats['cells']:
+        logger.info("[run_experiment] fit memo: %d of %d cells served without refitting (%.1f%%)",
+                    memo_stats['hits'], memo_stats['cells'], 100 * memo_stats['hits'] / memo_stats['cells'])
+
+    if store is not None:
+        results = store.load_results(list(horizons), selector_names, list(models))
+    else:
+        results = {hr_key: {selector_name: {model_name: defaultdict(list) for model_name in models}
+                            for selector_name in selector_names}
+                   for hr_key in horizons}
+        for hr_key, selector_name, k, model_name in build_grid(ranked_features, models):
+            cell_scores = scores.get((hr_key, selector_name, k, model_name), {})
+            for column in METRICS + TIMINGS:
+                results[hr_key][selector_name][model_name][column].append(cell_scores.get(column, np.nan))
+
+    if cv:
+        results, ranked_features = combine_folds(results, ranked_features, hr_list, n_splits)
+    return (results, ranked_features) if race_log is None else (results, ranked_features, race_log)
+
+
+def combine_folds(fold_results, fold_rankings, hr_list, n_splits):
+    """
+    Collapses the per-fold results of a cv run into one entry per horizon.
+
+    Returns:
+    tuple: (results, ranked_features) with results[f'hr={hr}'][selector][model][metric]
+        -> mean over folds for every k, results[...][f'{metric}_folds'] -> list over k of
+        the per-fold values (NaN where a fold's ranking is shorter) and
+        ranked_features[f'hr={hr}'][selector] -> list of the per-fold rankings.
+    """
+    results, ranked_features = {}, {}
+    for hr in hr_list:
+        fold_keys = [split_key(hr, fold) for fold in range(n_splits)]
+        hr_key = split_key(hr)
+        results[hr_key], ranked_features[hr_key] = {}, {}
+        for selector_name in fold_results[fold_keys[0]]:
+            ranked_features[hr_key][selector_name] = [fold_rankings[key][selector_name] for key in fold_keys]
+            results[hr_key][selector_name] = {}
+            for model_name in fold_results[fold_keys[0]][selector_name]:
+                model_results = defaultdict(list)
+                for metric in METRICS + TIMINGS:
+                    curves = [fold_results[key][selector_name][model_name][metric] for key in fold_keys]
+                    values = np.full((max(len(curve) for curve in curves), n_splits), np.nan)
+                    for fold, curve in enumerate(curves):
+                        values[:len(curve), fold] = curve
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore", category=RuntimeWarning)
+                        model_results[metric] = list(np.nanmean(values, axis=1))
+                    if metric in METRICS:
+                        model_results[f'{metric}_folds'] = values.tolist()
+                results[hr_key][selector_name][model_name] = model_results
+    return results, ranked_features
+
+
+def timing_summary(results, by=('model',)):
+    """
+    Summarizes the per-cell TIMINGS of a `run_experiment` / `ResultsStore.load_results`
+    layout, to see which models, selectors or horizons dominate the runtime.
+
+    Parameters:
+    results (dict): results[f'hr={hr}'][selector][model][column] -> list over k.
+    by (tuple): Grouping columns among 'hr', 'selector' and 'model'.
+
+    Returns:
+    pd.DataFrame: Per group, the number of fitted cells, total and mean fit seconds, mean
+        predict and metric seconds (the predict time is the inference latency on the whole
+        test set), maximum peak RSS growth and mean model size (NaN unless the run recorded it,
+        `model_size=True`), sorted by total fit time.
+        Cells served from the fit memo carry no timings and are not counted.
+    """
+    rows = [
+        {'hr': hr, 'selector': selector, 'model': model, 'k': k,
+         **{column: values[column][k - 1] for column in TIMINGS if column in values}}
+        for hr, selectors in results.items()
+        for selector, models in selectors.items()
+        for model, values in models.items()
+        for k in range(1, len(values.get('fit_seconds', [])) + 1)
+    ]
+    cells = pd.DataFrame(rows, columns=['hr', 'selector', 'model', 'k', *TIMINGS]).dropna(subset=['fit_seconds'])
+    summary = cells.groupby(list(by)).agg(
+        cells=('fit_seconds', 'size'),
+        fit_seconds_total=('fit_seconds', 'sum'),
+        fit_seconds_mean=('fit_seconds', 'mean'),
+        predict_seconds_mean=('predict_seconds', 'mean'),
+        metric_seconds_mean=('metric_seconds', 'mean'),
+        peak_rss_mb_max=('peak_rss_mb', 'max'),
+        model_bytes_mean=('model_bytes', 'mean'),
+    )
+    return summary.sort_values('fit_seconds_total', ascending=False)
+
+
+def throughput_benchmark(df, hr, models, selector_name='SelectKBest_f', ks=None, budgets=None, n_cpus=None,
+                         imputer_cache=None, imputer=None):
+    """
+    Measures the grid throughput of `hr` under different splits of the thread budget
+    between worker processes and threads per worker, to pick `n_jobs` /
+    `threads_per_worker` for `run_experiment` on a given machine.
+
+    Every configuration evaluates the same cells (every model at every k of `ks` on the
+    ranking of `selector_name`) on a fresh process pool, pool start-up included.
+
+    Parameters:
+    df (pd.DataFrame): Extraction with 'PatientID', 'hr', 'NAV' and the feature columns.
+    hr (int): Horizon whose split is used.
+    models (dict): Model name -> unfitted estimator.
+    selector_name (str): Ranking defining the selected features of every k.
+    ks (list or None): Numbers of features evaluated (default: coarse grid with step 5).
+    budgets (list or None): (workers, threads_per_worker) pairs; threads None keeps the
+        library defaults. Default: every exact split of the cores (1 × n, ..., n × 1) plus
+        the unmanaged n × default configuration.
+    n_cpus (int or None): Core budget (default os.cpu_count()).
+    imputer_cache (str or None): Directory of the fitted-imputer cache (None refits).
+    imputer (estimator or None): Unfitted imputer replacing the default IterativeImputer.
+
+    Returns:
+    pd.DataFrame: One row per configuration: workers, threads_per_worker, cells, seconds
+        and cells_per_second, fastest first.
+    """
+    n_cpus = n_cpus or os.cpu_count() or 1
+    if budgets is None:
+        budgets = [(workers, n_cpus // workers) for workers in range(1, n_cpus + 1) if n_cpus % workers == 0]
+        budgets.append((n_cpus, None))
+
+    hr_key = split_key(hr)
+    split = prepare_horizon(df, hr, imputer_cache, imputer)
+    ranking = get_ranked_features(split['X_train'], split['y_train'], selector_name)
+    order = tuple(list(split['X_train'].columns).index(column) for column in ranking)
+    ks = coarse_k_grid(len(ranking), 5) if ks is None else ks
+    tasks = [(hr_key, model_name, order, k) for k in ks for model_name in models]
+
+    rows = []
+    with SharedArrays() as shared:
+        splits = {hr_key: publish_split(shared, split)}
+        for workers, threads in budgets:
+            start = time.perf_counter()
+            # A pool even for one worker: limits never leak into the calling process
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(splits, with_threads(models, threads), threads)) as executor:
+                list(_imap(executor, _cell_task, tasks, workers, desc=f"{workers} x {threads or 'default'}"))
+            seconds = time.perf_counter() - start
+            rows.append({'workers': workers, 'threads_per_worker': threads, 'cells': len(tasks),
+                         'seconds': seconds, 'cells_per_second': len(tasks) / seconds})
+    return pd.DataFrame(rows).sort_values('cells_per_second', ascending=False).reset_index(drop=True)
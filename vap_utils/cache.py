@@ -0,0 +1,120 @@
+"""
+Content-addressed cache of fitted imputers.
+
+The same `IterativeImputer(max_iter=1000, random_state=42)` is fitted on identical
+training splits in the benchmark, the ranking loop, the final models and the
+explainability notebook. `fit_transform_cached` hashes the training matrix, its
+column order and the imputer parameters, and keeps under that key the fitted
+imputer, the imputed training matrix and one imputed matrix per test set:
+
+    <cache_dir>/<train key>/imputer.joblib
+    <cache_dir>/<train key>/train.npy
+    <cache_dir>/<train key>/test_<test key>.npy
+
+A later call with the same inputs loads everything from disk instead of refitting.
+"""
+import hashlib
+import os
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+
+def fingerprint(*parts):
+    """
+    Returns a hex digest identifying the content of `parts`.
+
+    Arrays and DataFrames are hashed by shape, dtype and raw values (plus column
+    names for DataFrames); any other object is hashed by its repr.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, pd.Series):
+            part = part.to_frame()
+        if isinstance(part, pd.DataFrame):
+            digest.update(repr(list(part.columns)).encode())
+            part = part.to_numpy()
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            digest.update(f"{part.shape}{part.dtype}".encode())
+            digest.update(part.tobytes())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+def _imputer_key(imputer, X_train):
+    params = sorted(imputer.get_params(deep=True).items())
+    return fingerprint(type(imputer).__name__, sklearn.__version__, params, X_train)
+
+
+def atomic_save(path, save):
+    """
+    Writes `path` through `save(tmp_path)` on a temporary file of the same directory,
+    then renames it into place: concurrent writers (cache entries, queue files, pools)
+    never leave a partially written file under `path`.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _save_array(path, array):
+    def save(tmp_path):
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+    atomic_save(path, save)
+
+
+def fit_transform_cached(imputer, X_train, X_test=None, cache_dir="data/cache/imputers"):
+    """
+    Fits `imputer` on `X_train` and imputes `X_train` and `X_test`, reusing any
+    previous result computed on the same data with the same parameters.
+
+    Parameters:
+    imputer (estimator): Unfitted imputer, e.g. IterativeImputer(max_iter=1000, random_state=42).
+    X_train (array-like): Training matrix the imputer is fitted on.
+    X_test (array-like or None): Matrix transformed with the fitted imputer.
+    cache_dir (str or None): Cache root. None disables the cache.
+
+    Returns:
+    tuple: (fitted imputer, imputed X_train, imputed X_test or None) as numpy arrays,
+        like `imputer.fit_transform` / `imputer.transform`.
+    """
+    if cache_dir is None:
+        X_train_imp = imputer.fit_transform(X_train)
+        X_test_imp = None if X_test is None else imputer.transform(X_test)
+        return imputer, X_train_imp, X_test_imp
+
+    entry = os.path.join(cache_dir, _imputer_key(imputer, X_train))
+    os.makedirs(entry, exist_ok=True)
+    imputer_path = os.path.join(entry, "imputer.joblib")
+    train_path = os.path.join(entry, "train.npy")
+
+    if os.path.exists(imputer_path) and os.path.exists(train_path):
+        imputer = joblib.load(imputer_path)
+        X_train_imp = np.load(train_path)
+    else:
+        X_train_imp = imputer.fit_transform(X_train)
+        atomic_save(imputer_path, lambda tmp_path: joblib.dump(imputer, tmp_path))
+        _save_array(train_path, X_train_imp)
+
+    if X_test is None:
+        return imputer, X_train_imp, None
+
+    test_path = os.path.join(entry, f"test_{fingerprint(X_test)}.npy")
+    if os.path.exists(test_path):
+        X_test_imp = np.load(test_path)
+    else:
+        X_test_imp = imputer.transform(X_test)
+        _save_array(test_path, X_test_imp)
+
+    return imputer, X_train_imp, X_test_imp
@@ -0,0 +1,75 @@
+"""
+Balanced bagging over disjoint majority subsets.
+
+Downsampling to a 1:1 ratio throws away most negatives. `BalancedBaggingClassifier`
+trains one model per disjoint majority subset (`balanced_bags`), each on all the
+positives plus its own negatives, and averages their probabilities: every negative is
+used once, and each fit stays as small as the usual downsampled fit. The members are
+trained in parallel threads (CatBoost, XGBoost, LightGBM and the sklearn forests
+release the GIL while fitting), sharing the training matrix without copying it to
+other processes; each member only gathers its own rows.
+"""
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.utils.validation import check_is_fitted
+
+from vap_utils.bench import n_workers, thread_budget, with_threads
+from vap_utils.registry import make_model
+from vap_utils.sampling import balanced_bags
+
+
+def _fit_member(estimator, X, y, rows):
+    return clone(estimator).fit(X[rows], y[rows])
+
+
+class BalancedBaggingClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Average of models trained on balanced bags with disjoint majority subsets.
+
+    Parameters:
+    estimator (classifier or None): Model of every bag (default the benchmark's
+        CatBoostClassifier(verbose=0, random_state=42)).
+    n_estimators (int or None): Number of bags. None uses every negative: as many bags
+        as the majority class fills (n_majority // (majority_proportion × n_minority)).
+    majority_proportion (float): Ratio of majority to minority samples in every bag.
+    n_jobs (int or None): Members fitted at once (-1 = all cores). The cores are split
+        between them (`thread_budget`), so each member gets n_cpus // n_jobs threads.
+    random_state (int): Seed of the majority permutation. With n_estimators=1 the single
+        member is trained on exactly the `downsampling` rows.
+
+    Attributes:
+    estimators_ (list): Fitted members.
+    bags_ (list): Row indices of every member.
+    classes_ (ndarray): Class labels.
+    """
+
+    def __init__(self, estimator=None, n_estimators=None, majority_proportion=1.0, n_jobs=-1, random_state=42):
+        self.estimator = estimator
+        self.n_estimators = n_estimators
+        self.majority_proportion = majority_proportion
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X = np.asarray(X)
+        y = np.asarray(y)
+        self.classes_ = np.unique(y)
+        self.bags_ = balanced_bags(y, self.n_estimators, self.majority_proportion, self.random_state)
+
+        estimator = make_model('CatBoost') if self.estimator is None else self.estimator
+        # No more parallel members than bags; the cores are shared between the members
+        workers, threads = thread_budget(min(n_workers(self.n_jobs), len(self.bags_)))
+        estimator = with_threads({'member': estimator}, threads)['member']
+        self.estimators_ = Parallel(n_jobs=workers, prefer="threads")(
+            delayed(_fit_member)(estimator, X, y, rows) for rows in self.bags_
+        )
+        return self
+
+    def predict_proba(self, X):
+        check_is_fitted(self, "estimators_")
+        X = np.asarray(X)
+        return np.mean([member.predict_proba(X) for member in self.estimators_], axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,207 @@
+"""
+Vectorized kernel for the six benchmark metrics.
+
+`binary_metrics` computes AUC, PR_AUC, Accuracy, Recall, Precision and F1 with the
+same definitions as sklearn's `roc_auc_score`, `average_precision_score`,
+`accuracy_score`, `recall_score`, `precision_score` and `f1_score` (zero_division=0),
+sorting the scores once for both ranking metrics and skipping sklearn's per-call
+input validation. It also takes a 2-D array of scores, one row per prediction set
+(k values, models, bootstrap resamples...), and scores every row in one call.
+"""
+import numpy as np
+import pandas as pd
+
+METRICS = ['AUC', 'PR_AUC', 'Accuracy', 'Recall', 'Precision', 'F1']
+
+# Per-cell measurements recorded by the benchmark engine next to METRICS
+TIMINGS = ['fit_seconds', 'predict_seconds', 'metric_seconds', 'peak_rss_mb', 'model_bytes']
+
+
+def _divide(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), 0.0)
+
+
+def ranking_metrics(y_true, y_prob, sample_weight=None):
+    """
+    ROC AUC and average precision of every row of `y_prob` from a single sort.
+
+    Parameters:
+    y_true (array-like): Binary labels, shape (n,) or (m, n).
+    y_prob (array-like): Scores of the positive class, shape (n,) or (m, n). Scores
+        shared by every row (shape (n,)) are sorted only once.
+    sample_weight (array-like or None): Sample weights, shape (n,) or (m, n), e.g.
+        bootstrap counts (a weight of 2 counts the sample twice).
+
+    Returns:
+    tuple: (auc, average_precision), floats when every input is 1-D and arrays of shape
+        (m,) otherwise. NaN where a row has no positive or (for AUC) no negative label.
+    """
+    y_prob = np.asarray(y_prob, dtype=np.float64)
+    y_true = np.asarray(y_true) == 1
+    weights = None if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    one_row = y_prob.ndim == 1 and y_true.ndim == 1 and (weights is None or weights.ndim == 1)
+
+    if y_prob.ndim == 1:
+        # Shared scores: sort once, then sum the (weighted) labels of every group of tied
+        # scores; cumulative sums over the groups give one ROC / PR point per threshold.
+        order = np.argsort(-y_prob, kind="stable")
+        scores = y_prob[order]
+        starts = np.flatnonzero(np.r_[True, scores[1:] != scores[:-1]])
+        labels = np.atleast_2d(y_true[..., order])
+        if weights is None:
+            positives = np.add.reduceat(labels.astype(np.float64), starts, axis=1)
+            totals = np.diff(np.r_[starts, len(scores)]).astype(np.float64)
+        else:
+            weights = np.atleast_2d(weights[..., order])
+            positives = np.add.reduceat(weights * labels, starts, axis=1)
+            totals = np.add.reduceat(weights, starts, axis=1)
+        tps = np.cumsum(positives, axis=1)
+        fps = np.cumsum(np.broadcast_to(totals - positives, tps.shape), axis=1)
+        is_end = True
+        tps_previous = np.zeros_like(tps)
+        fps_previous = np.zeros_like(fps)
+        tps_previous[:, 1:] = tps[:, :-1]
+        fps_previous[:, 1:] = fps[:, :-1]
+    else:
+        order = np.argsort(-y_prob, axis=1, kind="stable")
+        scores = np.take_along_axis(y_prob, order, axis=1)
+        labels = np.take_along_axis(np.broadcast_to(y_true, y_prob.shape), order, axis=1)
+        if weights is None:
+            tps = np.cumsum(labels, axis=1, dtype=np.float64)
+            fps = np.arange(1, labels.shape[1] + 1) - tps
+        else:
+            weights = np.take_along_axis(np.broadcast_to(weights, y_prob.shape), order, axis=1)
+            tps = np.cumsum(weights * labels, axis=1)
+            fps = np.cumsum(weights * ~labels, axis=1)
+
+        # Last position of every group of tied scores (one ROC / PR point per threshold).
+        # tps and fps never decrease, so a running max of their values at group ends gives
+        # the point of the previous threshold (0 before the first one).
+        is_end = np.ones(scores.shape, dtype=bool)
+        is_end[:, :-1] = scores[:, 1:] != scores[:, :-1]
+        tps_previous = np.zeros_like(tps)
+        fps_previous = np.zeros_like(fps)
+        tps_previous[:, 1:] = np.maximum.accumulate(np.where(is_end, tps, 0.0), axis=1)[:, :-1]
+        fps_previous[:, 1:] = np.maximum.accumulate(np.where(is_end, fps, 0.0), axis=1)[:, :-1]
+
+    n_pos = tps[:, -1]
+    n_neg = fps[:, -1]
+    # Trapezoids between consecutive thresholds of the ROC curve
+    auc = np.sum(is_end * (fps - fps_previous) * (tps + tps_previous), axis=1) / 2
+    auc = np.where((n_pos > 0) & (n_neg > 0), _divide(auc, n_pos * n_neg), np.nan)
+    # Sum over thresholds of (R_n - R_{n-1}) * P_n
+    precision = _divide(tps, tps + fps)
+    average_precision = np.sum(is_end * (tps - tps_previous) * precision, axis=1)
+    average_precision = np.where(n_pos > 0, _divide(average_precision, n_pos), np.nan)
+
+    if one_row:
+        return float(auc[0]), float(average_precision[0])
+    return auc, average_precision
+
+
+def binary_metrics(y_true, y_prob, y_pred=None, threshold=0.5, sample_weight=None):
+    """
+    Computes every metric of METRICS for one or many prediction sets.
+
+    Parameters:
+    y_true (array-like): Binary labels, shape (n,) (shared by every row) or (m, n).
+    y_prob (array-like): Scores of the positive class, shape (n,) or (m, n).
+    y_pred (array-like or None): Predicted labels for the thresholded metrics, same shape
+        as y_prob (e.g. `model.predict`). None uses y_prob > threshold.
+    threshold (float): Decision threshold when y_pred is None.
+    sample_weight (array-like or None): Sample weights, shape (n,) or (m, n).
+
+    Returns:
+    dict: metric name -> float (every input 1-D) or array of shape (m,).
+    """
+    y_prob = np.asarray(y_prob, dtype=np.float64)
+    y_true = np.asarray(y_true) == 1
+    auc, average_precision = ranking_metrics(y_true, y_prob, sample_weight)
+    one_row = np.ndim(auc) == 0
+
+    y_pred = y_prob > threshold if y_pred is None else np.asarray(y_pred) == 1
+    if sample_weight is not None and y_pred.ndim == 1 and y_true.ndim == 1:
+        # Shared predictions, one weighting per row (bootstrap): matrix-vector products
+        weights = np.atleast_2d(np.asarray(sample_weight, dtype=np.float64))
+        tp = weights @ (y_pred & y_true)
+        fp = weights @ (y_pred & ~y_true)
+        fn = weights @ (~y_pred & y_true)
+        total = weights.sum(axis=1)
+    else:
+        weights = 1.0 if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        shape = np.broadcast_shapes(np.atleast_2d(y_pred).shape, np.atleast_2d(y_true).shape, np.shape(weights))
+        y_pred = np.broadcast_to(y_pred, shape)
+        y_true = np.broadcast_to(y_true, shape)
+        weights = np.broadcast_to(weights, shape)
+        tp = np.sum(weights * (y_pred & y_true), axis=1)
+        fp = np.sum(weights * (y_pred & ~y_true), axis=1)
+        fn = np.sum(weights * (~y_pred & y_true), axis=1)
+        total = np.sum(weights, axis=1)
+
+    scores = {
+        'AUC': auc,
+        'PR_AUC': average_precision,
+        'Accuracy': _divide(total - fp - fn, total),
+        'Recall': _divide(tp, tp + fn),
+        'Precision': _divide(tp, tp + fp),
+        'F1': _divide(2 * tp, 2 * tp + fp + fn),
+    }
+    if one_row:
+        return {metric: float(np.ravel(value)[0]) for metric, value in scores.items()}
+    return scores
+
+
+def bootstrap_ci(y_true, y_prob, y_pred=None, metrics=METRICS, n_boot=2000, alpha=0.05, threshold=0.5,
+                 seed=42, max_elements=20_000_000):
+    """
+    Percentile bootstrap confidence intervals of the metrics of one prediction set.
+
+    The (n_boot x n) matrix of resampled indices is drawn once and turned into per-sample
+    counts, so every replicate is a weighting of the same samples: the scores are sorted
+    once and all replicates are scored by the `binary_metrics` kernel in batches of at
+    most `max_elements` values, without a Python loop over replicates.
+
+    Parameters:
+    y_true (array-like): Binary labels, shape (n,).
+    y_prob (array-like): Scores of the positive class, shape (n,).
+    y_pred (array-like or None): Predicted labels (None uses y_prob > threshold).
+    metrics (list): Metrics to report, from METRICS.
+    n_boot (int): Number of bootstrap replicates.
+    alpha (float): 1 - confidence level (0.05 gives 95% intervals).
+    threshold (float): Decision threshold when y_pred is None.
+    seed (int): Seed of the resampling.
+    max_elements (int): Memory bound of a batch of replicates.
+
+    Returns:
+    pd.DataFrame: One row per metric with the point estimate on the full set ('estimate'),
+        the bootstrap 'lower' / 'upper' percentiles and 'std'. Replicates without both
+        classes are ignored for AUC / PR_AUC.
+    """
+    y_true = np.asarray(y_true)
+    y_prob = np.asarray(y_prob, dtype=np.float64)
+    y_pred = (y_prob > threshold).astype(int) if y_pred is None else np.asarray(y_pred)
+    n = len(y_true)
+
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, n, size=(n_boot, n))
+    batch = max(1, max_elements // max(n, 1))
+    replicates = {metric: [] for metric in metrics}
+    for start in range(0, n_boot, batch):
+        rows = indices[start:start + batch]
+        # counts[b, i] = number of times sample i is drawn in replicate b
+        offsets = np.arange(len(rows))[:, np.newaxis] * n
+        counts = np.bincount((rows + offsets).ravel(), minlength=len(rows) * n).reshape(len(rows), n)
+        batch_scores = binary_metrics(y_true, y_prob, y_pred, sample_weight=counts)
+        for metric in metrics:
+            replicates[metric].append(batch_scores[metric])
+
+    estimate = binary_metrics(y_true, y_prob, y_pred)
+    summary = {}
+    for metric in metrics:
+        values = np.concatenate(replicates[metric])
+        values = values[~np.isnan(values)]
+        lower, upper = np.percentile(values, [100 * alpha / 2, 100 * (1 - alpha / 2)]) if len(values) else (np.nan, np.nan)
+        summary[metric] = {'estimate': estimate[metric], 'lower': lower, 'upper': upper,
+                           'std': values.std() if len(values) else np.nan}
+    return pd.DataFrame(summary).T
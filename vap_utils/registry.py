@@ -0,0 +1,113 @@
+"""
+Lazy registry of the models and feature selectors of the benchmark.
+
+Maps the names used in the `models` and `selectors` dicts of the notebooks to
+factories. A model backend (xgboost, lightgbm, catboost, sklearn estimators) is
+imported the first time one of its models is built, so a process that only needs
+CatBoost never pays for importing the rest. This module only imports the standard
+library, so `import vap_utils.registry` is immediate.
+
+    models = make_models()                      # the 12 benchmark models
+    models = make_models(['CatBoost'])          # imports catboost only
+    ranking = get_selector('mRMR')(X_train, y_train)
+"""
+import importlib
+from functools import partial
+
+# Model name -> (module, class, constructor parameters) as in 02_BEST_CLASSIFIER
+MODELS = {
+    'XGBoost': ('xgboost', 'XGBClassifier', {'eval_metric': 'auc', 'random_state': 42}),
+    'LightGBM': ('lightgbm', 'LGBMClassifier', {'verbose': -1, 'random_state': 42}),
+    'CatBoost': ('catboost', 'CatBoostClassifier', {'verbose': 0, 'random_state': 42}),
+    'RandomForest': ('sklearn.ensemble', 'RandomForestClassifier', {'random_state': 42}),
+    'GradientBoosting': ('sklearn.ensemble', 'GradientBoostingClassifier', {'random_state': 42}),
+    'ExtraTrees': ('sklearn.ensemble', 'ExtraTreesClassifier', {'random_state': 42}),
+    'AdaBoost': ('sklearn.ensemble', 'AdaBoostClassifier', {'random_state': 42}),
+    'LogisticRegression': ('sklearn.linear_model', 'LogisticRegression', {'random_state': 42}),
+    'KNN': ('sklearn.neighbors', 'KNeighborsClassifier', {}),
+    'NaiveBayes': ('sklearn.naive_bayes', 'GaussianNB', {}),
+    'MLP': ('sklearn.neural_network', 'MLPClassifier', {'random_state': 42}),
+    'DecisionTree': ('sklearn.tree', 'DecisionTreeClassifier', {'random_state': 42}),
+}
+
+# Selector names understood by `vap_utils.selection.get_ranked_features`
+SELECTORS = [
+    'mRMR',
+    'SelectKBest_f',
+    'SelectKBest_MI',
+    'GenericUnivariateSelect',
+    'VarianceThreshold',
+    'ModelBased_XGB',
+    'ModelBased_LGBM',
+    'ModelBased_RF',
+    'ModelBased_CatBoost',
+    'ModelBased_ExtraTrees',
+]
+
+
+def load_class(module, name):
+    """Imports `module` (cached by Python after the first call) and returns its attribute `name`."""
+    return getattr(importlib.import_module(module), name)
+
+
+def model_factory(name, **params):
+    """
+    Returns a callable building a fresh, unfitted model `name`.
+
+    Parameters:
+    name (str): Key of MODELS.
+    **params: Overrides of the registered constructor parameters.
+
+    Returns:
+    callable: Without arguments, returns the estimator. The backend is imported on the first call;
+        an ImportError naming the package is raised if it is not installed.
+    """
+    if name not in MODELS:
+        raise ValueError(f"Unknown model: {name}. Available: {list(MODELS)}")
+    module, class_name, defaults = MODELS[name]
+
+    def factory():
+        try:
+            model_class = load_class(module, class_name)
+        except ModuleNotFoundError as exc:
+            package = module.split('.')[0]
+            if exc.name != package:
+                raise
+            raise ImportError(f"Model {name} needs the '{package}' package, which is not installed: "
+                              f"install it or leave {name} out of make_models(names).") from exc
+        return model_class(**{**defaults, **params})
+    return factory
+
+
+def make_model(name, **params):
+    """Builds the unfitted model `name` (see `model_factory`)."""
+    return model_factory(name, **params)()
+
+
+def make_models(names=None):
+    """
+    Builds the `models` dict of the benchmark, importing only the needed backends.
+
+    Parameters:
+    names (list or None): Model names, in the order of the returned dict. None builds every model of MODELS.
+
+    Returns:
+    dict: name -> unfitted estimator.
+    """
+    return {name: make_model(name) for name in (MODELS if names is None else names)}
+
+
+def _rank(X, y, method):
+    from vap_utils.selection import get_ranked_features
+    return get_ranked_features(X, y, method)
+
+
+def get_selector(name):
+    """
+    Returns the ranking function of selector `name`: f(X, y) -> features sorted by
+    decreasing importance. `vap_utils.selection` and the selector backend are imported
+    on the first call.
+    """
+    if name not in SELECTORS:
+        raise ValueError(f"Unknown selector: {name}. Available: {SELECTORS}")
+    return partial(_rank, method=name)
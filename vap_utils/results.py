@@ -0,0 +1,221 @@
+"""
+Dense layout of the benchmark results.
+
+`ResultsTensor` holds every (hr, selector, model, k, metric) value of a grid in one
+float array, NaN for the cells that were not evaluated (or are beyond the length of a
+ranking), with the labels of every axis:
+
+    tensor.values.shape == (len(tensor.hrs), len(tensor.selectors), len(tensor.models),
+                            len(tensor.ks), len(tensor.metrics))
+
+It is built from the nested `results[f'hr={hr}'][selector][model][metric] -> list`
+layout of `run_experiment` / `ResultsStore.load_results` or read directly from a
+store (`ResultsStore.load_tensor`). The summaries behind the heatmaps of
+02_BEST_CLASSIFIER (mean ± std of the `top` best scores of every curve) are computed
+with one sort along k instead of Python loops over the nested dicts.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from vap_utils.metrics import METRICS, TIMINGS
+
+AXES = ('hr', 'selector', 'model', 'k', 'metric')
+
+
+class ResultsTensor:
+    """
+    Labelled (hr, selector, model, k, metric) array of benchmark results.
+
+    Parameters:
+    values (ndarray): Array of shape (hrs, selectors, models, ks, metrics).
+    hrs, selectors, models, metrics (list): Labels of the axes ('hr=-24', 'mRMR', 'CatBoost', 'PR_AUC'...).
+    ks (list or None): Numbers of features of the k axis (default 1..values.shape[3]).
+    """
+
+    def __init__(self, values, hrs, selectors, models, metrics, ks=None):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.hrs = list(hrs)
+        self.selectors = list(selectors)
+        self.models = list(models)
+        self.ks = list(range(1, self.values.shape[3] + 1)) if ks is None else list(ks)
+        self.metrics = list(metrics)
+        expected = tuple(len(labels) for labels in self.labels.values())
+        if self.values.shape != expected:
+            raise ValueError(f"values has shape {self.values.shape}, the labels give {expected}.")
+
+    @property
+    def labels(self):
+        return {'hr': self.hrs, 'selector': self.selectors, 'model': self.models, 'k': self.ks,
+                'metric': self.metrics}
+
+    def __repr__(self):
+        shape = ", ".join(f"{axis}: {len(labels)}" for axis, labels in self.labels.items())
+        return f"ResultsTensor({shape})"
+
+    # ==== Constructors ====
+    @classmethod
+    def from_nested(cls, results, selectors=None, models=None, metrics=None):
+        """
+        Builds the tensor from results[f'hr={hr}'][selector][model][metric] -> list over k.
+
+        Parameters:
+        results (dict): Nested layout of `run_experiment` / `ResultsStore.load_results`.
+        selectors, models (list or None): Labels (and order) of the axes. None takes them
+            from `results` in order of appearance; labels missing in a horizon give NaN.
+        metrics (list or None): Metrics to keep (default every column of METRICS and
+            TIMINGS present in `results`).
+
+        Returns:
+        ResultsTensor
+        """
+        curves = [(hr, selector, model, values)
+                  for hr, hr_results in results.items()
+                  for selector, selector_results in hr_results.items()
+                  for model, values in selector_results.items()]
+        if selectors is None:
+            selectors = list(dict.fromkeys(selector for _, selector, _, _ in curves))
+        if models is None:
+            models = list(dict.fromkeys(model for _, _, model, _ in curves))
+        if metrics is None:
+            present = {metric for *_, values in curves for metric in values}
+            metrics = [metric for metric in METRICS + TIMINGS if metric in present]
+        n_k = max((len(values[metric]) for *_, values in curves for metric in metrics if metric in values), default=0)
+
+        hrs = list(results)
+        index = {axis: {label: i for i, label in enumerate(labels)}
+                 for axis, labels in (('hr', hrs), ('selector', selectors), ('model', models))}
+        array = np.full((len(hrs), len(selectors), len(models), n_k, len(metrics)), np.nan)
+        for hr, selector, model, values in curves:
+            if selector not in index['selector'] or model not in index['model']:
+                continue
+            cell = array[index['hr'][hr], index['selector'][selector], index['model'][model]]
+            for m, metric in enumerate(metrics):
+                curve = values.get(metric, [])
+                cell[:len(curve), m] = curve
+        return cls(array, hrs, selectors, models, metrics)
+
+    # ==== Accessors ====
+    def _positions(self, axis, labels):
+        position = {label: i for i, label in enumerate(self.labels[axis])}
+        try:
+            return [position[label] for label in labels]
+        except KeyError as error:
+            raise KeyError(f"{error.args[0]!r} is not a label of the {axis} axis") from None
+
+    def sel(self, **labels):
+        """
+        Subset by labels, e.g. `tensor.sel(hr='hr=-24', metric=['AUC', 'PR_AUC'])`.
+
+        A single label drops its axis from the returned array, a list of labels keeps it
+        (in the given order). Axes that are not mentioned are kept whole.
+
+        Returns:
+        ndarray: Values with the remaining axes in (hr, selector, model, k, metric) order.
+        """
+        unknown = set(labels) - set(AXES)
+        if unknown:
+            raise ValueError(f"Unknown axes {sorted(unknown)}, expected {AXES}.")
+        index = []
+        for axis in AXES:
+            if axis not in labels:
+                index.append(slice(None))
+            elif isinstance(labels[axis], (list, tuple)):
+                index.append(self._positions(axis, labels[axis]))
+            else:
+                index.append(self._positions(axis, [labels[axis]])[0])
+        # Apply one axis at a time: numpy would pair several list indices element-wise
+        values = self.values
+        dim = 0
+        for i in index:
+            if isinstance(i, list):
+                values = np.take(values, i, axis=dim)
+                dim += 1
+            elif isinstance(i, int):
+                values = np.take(values, i, axis=dim)
+            else:
+                dim += 1
+        return values
+
+    def subset(self, **labels):
+        """Like `sel` with lists of labels, but returns a ResultsTensor."""
+        labels = {axis: list(value) if isinstance(value, (list, tuple)) else [value] for axis, value in labels.items()}
+        values = self.sel(**labels)
+        kept = {axis: labels.get(axis, self.labels[axis]) for axis in AXES}
+        return ResultsTensor(values, kept['hr'], kept['selector'], kept['model'], kept['metric'], kept['k'])
+
+    def curve(self, hr, selector, model, metric='PR_AUC'):
+        """Values over k of one (hr, selector, model) curve."""
+        return self.sel(hr=hr, selector=selector, model=model, metric=metric)
+
+    def to_frame(self, dropna=True):
+        """Long DataFrame with one row per (hr, selector, model, k) and one column per metric."""
+        index = pd.MultiIndex.from_product([self.hrs, self.selectors, self.models, self.ks], names=list(AXES[:4]))
+        frame = pd.DataFrame(self.values.reshape(-1, len(self.metrics)), index=index, columns=self.metrics)
+        return frame.dropna(how='all') if dropna else frame
+
+    # ==== Summaries ====
+    def top_values(self, top=5, metrics=None):
+        """
+        The `top` best values of every (hr, selector, model) curve.
+
+        Returns:
+        ndarray: Shape (hrs, selectors, models, top, metrics), sorted in decreasing order
+            along the 4th axis, NaN-padded when a curve has fewer than `top` evaluated k.
+        """
+        values = self.values if metrics is None else self.sel(metric=list(metrics))
+        # NaN sorts last in ascending order, so sorting the negated values puts them last too
+        return -np.sort(-values, axis=3)[:, :, :, :top, :]
+
+
+def _nan_stats(values, axis):
+    # Curves without any evaluated k give NaN, like np.nanmean of an empty list
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(values, axis=axis), np.nanstd(values, axis=axis)
+
+
+def _frames(tensor, mean, std, metrics):
+    df_mean = pd.DataFrame(mean, index=tensor.models, columns=metrics)
+    df_std = pd.DataFrame(std, index=tensor.models, columns=metrics)
+    return df_mean, df_std
+
+
+def summary_by_hr(tensor, metrics=METRICS, top=5):
+    """
+    Per horizon and model, mean ± std of the pooled `top` best scores of every selector
+    (the heatmaps of `heatmaps_por_hr`).
+
+    Returns:
+    dict: hr -> (df_mean, df_std), models × metrics DataFrames.
+    """
+    # (hrs, selectors, models, top, metrics) -> pool selectors and top values
+    mean, std = _nan_stats(tensor.top_values(top, metrics), axis=(1, 3))
+    return {hr: _frames(tensor, mean[h], std[h], metrics) for h, hr in enumerate(tensor.hrs)}
+
+
+def summary_pooled(tensor, metrics=METRICS, top=5):
+    """
+    Per model, mean ± std of the `top` best scores of every (hr, selector) curve pooled
+    together (the bar charts of `analizar_resultados_metricas`).
+
+    Returns:
+    tuple: (df_mean, df_std), models × metrics DataFrames.
+    """
+    mean, std = _nan_stats(tensor.top_values(top, metrics), axis=(0, 1, 3))
+    return _frames(tensor, mean, std, metrics)
+
+
+def summary_global(tensor, metrics=METRICS, top=5):
+    """
+    Per model, average over the (hr, selector) curves of the mean and of the std of their
+    `top` best scores (the heatmap of `resumen_modelos_globales`).
+
+    Returns:
+    tuple: (df_mean, df_std), models × metrics DataFrames.
+    """
+    curve_mean, curve_std = _nan_stats(tensor.top_values(top, metrics), axis=3)
+    mean, _ = _nan_stats(curve_mean, axis=(0, 1))
+    std, _ = _nan_stats(curve_std, axis=(0, 1))
+    return _frames(tensor, mean, std, metrics)
@@ -0,0 +1,102 @@
+"""
+Majority-class downsampling by row indices.
+
+`downsampling` keeps every minority row and draws `majority_proportion` × n_minority
+majority rows with the same draw as `resample(..., replace=False, random_state=42)`.
+`downsample_indices` returns the positions of those rows, so callers gather the
+training matrix once (or slice a shared one) instead of copying it per class.
+`balanced_bags` extends the draw to several disjoint majority subsets, the training
+sets of `vap_utils.ensemble.BalancedBaggingClassifier`.
+"""
+import numpy as np
+
+
+def _majority_permutation(y_train, random_state):
+    # Same draw as sklearn's resample(..., replace=False, random_state=random_state):
+    # shuffle of arange(n_majority) with a RandomState, then the first n rows
+    majority = np.flatnonzero(y_train != 1)
+    order = np.arange(len(majority))
+    np.random.RandomState(random_state).shuffle(order)
+    return majority[order]
+
+
+def downsample_indices(y_train, majority_proportion=1.0, random_state=42):
+    """
+    Row indices of the downsampled training set, without copying any feature.
+
+    `X_train[idx]`, `y_train[idx]` equal the output of `downsampling(X_train, y_train,
+    majority_proportion)`: minority rows first, in their original order, then the
+    majority rows drawn by `resample(..., replace=False, random_state=42)`.
+
+    Parameters:
+    y_train (array-like): Label array of the training data.
+    majority_proportion (float or None): Ratio of majority to minority samples (None keeps every row).
+    random_state (int): Seed of the majority draw.
+
+    Returns:
+    np.ndarray: Positional row indices.
+    """
+    y_train = np.asarray(y_train)
+    if majority_proportion is None:
+        return np.arange(len(y_train))
+
+    minority = np.flatnonzero(y_train == 1)
+    n_majority = int(len(minority) * majority_proportion)
+    majority = _majority_permutation(y_train, random_state)
+    if n_majority > len(majority):
+        raise ValueError(f"Cannot sample {n_majority} out of arrays with dim {len(majority)} when replace is False")
+    return np.concatenate((minority, majority[:n_majority]))
+
+
+def balanced_bags(y_train, n_bags=None, majority_proportion=1.0, random_state=42):
+    """
+    Row indices of several balanced training sets drawn from disjoint majority subsets.
+
+    Every bag holds all the minority rows plus its own `majority_proportion` × n_minority
+    majority rows, taken consecutively from one permutation of the majority class, so no
+    majority row is used twice. The first bag equals `downsample_indices`.
+
+    Parameters:
+    y_train (array-like): Label array of the training data.
+    n_bags (int or None): Number of bags. None uses as many as the majority class fills.
+    majority_proportion (float): Ratio of majority to minority samples in every bag.
+    random_state (int): Seed of the majority permutation.
+
+    Returns:
+    list: One array of positional row indices per bag.
+    """
+    y_train = np.asarray(y_train)
+    minority = np.flatnonzero(y_train == 1)
+    bag_size = int(len(minority) * majority_proportion)
+    majority = _majority_permutation(y_train, random_state)
+    max_bags = len(majority) // bag_size if bag_size else 0
+    n_bags = max_bags if n_bags is None else n_bags
+    if not 1 <= n_bags <= max_bags:
+        raise ValueError(f"Cannot draw {n_bags} disjoint bags of {bag_size} majority rows out of {len(majority)}")
+    return [np.concatenate((minority, majority[i * bag_size:(i + 1) * bag_size])) for i in range(n_bags)]
+
+
+def downsampling(X_train, y_train, majority_proportion=1.0):
+    """
+    Performs downsampling on the majority class to balance the dataset.
+
+    Parameters:
+    X_train (array-like): Feature matrix of the training data.
+    y_train (array-like): Label array corresponding to the training data.
+    majority_proportion (float or None):
+        - If float, ratio of majority class to minority class (e.g. 1.0 means balanced).
+        - If None, no downsampling is performed.
+
+    Returns:
+    tuple: Downsampled (or original) feature matrix and label array as numpy arrays.
+    """
+    X_train = np.asarray(X_train)
+    y_train = np.asarray(y_train)
+
+    if majority_proportion is None:
+        return X_train, y_train
+
+    # One gather of the selected rows (minority first, then the drawn majority rows)
+    indices = downsample_indices(y_train, majority_proportion)
+    y_balanced = y_train[indices].astype(np.result_type(np.float64, y_train.dtype))
+    return X_train[indices], y_balanced
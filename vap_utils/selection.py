@@ -0,0 +1,351 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from joblib import effective_n_jobs
+from sklearn.base import clone
+from sklearn.experimental import enable_iterative_imputer  # noqa
+from sklearn.feature_selection import (
+    GenericUnivariateSelect, SelectKBest, VarianceThreshold,
+    f_classif, mutual_info_classif
+)
+from sklearn.impute import IterativeImputer
+from sklearn.preprocessing import FunctionTransformer
+
+# Lower bound of the redundancy terms, as in mrmr-selection
+MRMR_FLOOR = 0.001
+
+
+# ==== 1) Create 5 random probes ====
+def add_random_probes(X: pd.DataFrame, n_probes: int = 5, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    X_aug = X.copy()
+    for i in range(n_probes):
+        X_aug[f"rand_probe_{i+1}"] = rng.normal(loc=0.0, scale=1.0, size=len(X_aug))
+    return X_aug
+
+
+# ==== 2) Iterative Imputer ====
+def minimal_preprocess(X: pd.DataFrame, y: pd.Series, imputer=None) -> pd.DataFrame:
+    """
+    Solo imputación iterativa sobre todas las columnas (asumidas numéricas).
+    Devuelve un DataFrame numérico sin NaNs, listo para VT + mRMR.
+    `imputer` (sin ajustar) sustituye al IterativeImputer(max_iter=1000, random_state=42)
+    por defecto, p.ej. FastIterativeImputer.
+    """
+    imputer = IterativeImputer(max_iter=1000, random_state=42) if imputer is None else clone(imputer)
+    X_imputed = imputer.fit_transform(X, y)
+    return pd.DataFrame(X_imputed, columns=X.columns, index=X.index)
+
+
+# ==== 3) Variance Threshold ====
+def apply_variance_threshold(X_num: pd.DataFrame, threshold: float = 0.01) -> pd.DataFrame:
+    vt = VarianceThreshold(threshold=threshold)
+    Xt = vt.fit_transform(X_num.values)
+    kept_mask = vt.get_support()
+    kept_cols = X_num.columns[kept_mask]
+    return pd.DataFrame(Xt, columns=kept_cols, index=X_num.index)
+
+
+# ==== 4) mRMR ranking ====
+def mrmr_ranking(X: pd.DataFrame, y, K: int | None = None) -> list[str]:
+    """
+    Implementación vectorizada de `mrmr_classif(X, y, K)` (relevancia F-statistic,
+    redundancia |Pearson|, denominador media): mismo orden de features.
+    La relevancia y la matriz de correlaciones feature-feature se calculan una sola vez;
+    la redundancia media de cada candidata se actualiza al seleccionar cada feature.
+    Como en mrmr_classif, las features con relevancia <= 0 no se ordenan.
+    """
+    X_values = np.asarray(X, dtype=np.float64)
+    relevance = np.nan_to_num(f_classif(X_values, np.asarray(y))[0], nan=0.0)
+    keep = np.flatnonzero(relevance > 0)
+    features = np.asarray(X.columns)[keep]
+    relevance = relevance[keep]
+
+    n_features = len(keep)
+    K = n_features if K is None else min(K, n_features)
+    if K == 0:
+        return []
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.corrcoef(X_values[:, keep], rowvar=False).reshape(n_features, n_features)
+    redundancy = np.clip(np.abs(np.nan_to_num(corr, nan=MRMR_FLOOR)), MRMR_FLOOR, None)
+
+    selected = []
+    available = np.ones(n_features, dtype=bool)
+    redundancy_sum = np.zeros(n_features)
+    for i in range(K):
+        if i == 0:
+            score = relevance.copy()
+        else:
+            redundancy_sum += redundancy[:, selected[-1]]
+            denominator = redundancy_sum / i
+            denominator[denominator == 1.0] = np.inf
+            with np.errstate(invalid="ignore"):
+                score = relevance / denominator
+        score[~available | np.isnan(score)] = -np.inf
+        best = int(np.argmax(score))
+        selected.append(best)
+        available[best] = False
+
+    return features[selected].tolist()
+
+
+def run_mrmr_ranking(X_num: pd.DataFrame, y: pd.Series, K: int | None = None) -> list[str]:
+    """
+    Devuelve lista de nombres ordenados (mejor → peor), igual que mrmr_classif.
+    Asegúrate de pasar DataFrame numérico sin NaNs.
+    """
+    if K is None:
+        K = X_num.shape[1]
+    return mrmr_ranking(X_num, y, K=K)
+
+
+# ==== 5) Filter agains probes ====
+def filter_below_random_probes(ranking: list[str], probe_prefix: str = "rand_probe_") -> list[str]:
+    """
+    Mantiene solo las variables con ranking mejor que la peor random probe.
+    Si no hay probes (o no están en el ranking), no filtra nada.
+    """
+    probe_positions = [i for i, f in enumerate(ranking) if f.startswith(probe_prefix)]
+    if not probe_positions:
+        return ranking  # no probes presentes
+    worst_probe_pos = max(probe_positions)  # índice más alto = peor entre las probes
+    return [f for i, f in enumerate(ranking) if i < worst_probe_pos and not f.startswith(probe_prefix)]
+
+
+# ==== 6) Pipeline end-to-end ====
+def feature_reduction_workflow(X_raw: pd.DataFrame, y: pd.Series,
+                               n_probes: int = 5,
+                               vt_threshold: float = 0.01,
+                               seed: int = 42,
+                               imputer=None) -> dict:
+    """
+    Devuelve:
+      - X_final: DataFrame reducido tras VT + mRMR + filtro contra probes
+      - ranking_all: ranking mRMR completo (incluyendo probes)
+      - kept_features: lista final de columnas mantenidas (sin probes)
+      - removed_by_vt: variables reales eliminadas por Variance Threshold
+      - removed_by_mrmr: variables reales eliminadas por el filtro mRMR (tras VT)
+      - removed_probes_by_vt: probes eliminadas por VT
+      - removed_probes_by_mrmr: probes eliminadas por el filtro mRMR (tras VT)
+      - vt_kept_features: columnas que sobrevivieron a VT (incluye probes si sobrevivieron)
+    """
+    # Helper
+    def is_probe(name: str) -> bool:
+        return str(name).startswith("rand_probe_")
+
+    # 1) Add probes
+    X_aug = add_random_probes(X_raw, n_probes=n_probes, seed=seed)
+
+    # 2) Imputation
+    X_pp = minimal_preprocess(X_aug, y, imputer=imputer)
+    pp_cols = list(X_pp.columns)
+
+    # 3) Variance Threshold
+    X_vt = apply_variance_threshold(X_pp, threshold=vt_threshold)
+    vt_kept_features = list(X_vt.columns)
+
+    # --- Removed by VT ---
+    removed_by_vt_all = [c for c in pp_cols if c not in vt_kept_features]
+    removed_by_vt = [c for c in removed_by_vt_all if not is_probe(c)]
+    removed_probes_by_vt = [c for c in removed_by_vt_all if is_probe(c)]
+
+    # 4) mRMR
+    ranking_all = run_mrmr_ranking(X_vt, y, K=X_vt.shape[1])
+
+    # 5) Filter by random probes (we keep the features ranked better thant the worst probe)
+    kept_features_with_probes = filter_below_random_probes(ranking_all, probe_prefix="rand_probe_")
+
+    # 6) Final features without probes
+    kept_features = [f for f in kept_features_with_probes if not is_probe(f)]
+    X_final = X_vt[kept_features].copy()
+
+    # --- Removed by mRMR---
+    removed_by_mrmr_all = [c for c in vt_kept_features if c not in kept_features]
+    removed_by_mrmr = [c for c in removed_by_mrmr_all if not is_probe(c)]
+    removed_probes_by_mrmr = [c for c in removed_by_mrmr_all if is_probe(c)]
+
+    return {
+        "X_final": X_final,
+        "ranking_all": ranking_all,
+        "kept_features": kept_features,
+        "removed_by_vt": removed_by_vt,
+        "removed_by_mrmr": removed_by_mrmr,
+        "removed_probes_by_vt": removed_probes_by_vt,
+        "removed_probes_by_mrmr": removed_probes_by_mrmr,
+        "vt_kept_features": vt_kept_features,
+    }
+
+
+# ==== 7) Stability selection over several probe seeds ====
+# Los workers heredan X e y por fork (una sola copia de solo lectura compartida);
+# cada tarea solo lleva la semilla.
+_STABILITY = {}
+
+
+def _init_stability(X, y, kwargs):
+    _STABILITY["X"] = X
+    _STABILITY["y"] = y
+    _STABILITY["kwargs"] = kwargs
+
+
+def _stability_task(seed: int) -> dict:
+    res = feature_reduction_workflow(_STABILITY["X"], _STABILITY["y"], seed=seed, **_STABILITY["kwargs"])
+    return {"ranking_all": res["ranking_all"],
+            "kept_features": res["kept_features"],
+            "vt_kept_features": res["vt_kept_features"]}
+
+
+def stability_selection(X_raw: pd.DataFrame, y: pd.Series,
+                        n_seeds: int = 20,
+                        n_probes: int = 5,
+                        vt_threshold: float = 0.01,
+                        seed: int = 42,
+                        imputer=None,
+                        threshold: float = 0.5,
+                        reuse_imputation: bool = False,
+                        n_jobs: int | None = -1) -> dict:
+    """
+    Ejecuta `feature_reduction_workflow` con las semillas seed, seed+1, ..., seed+n_seeds-1
+    (probes distintas en cada ejecución) en procesos paralelos y combina los resultados.
+    La primera ejecución coincide con `feature_reduction_workflow(..., seed=seed)`.
+
+    - threshold: frecuencia mínima de selección para entrar en el consenso.
+    - reuse_imputation: si True, X_raw se imputa una sola vez y las probes (sin NaNs) se
+      añaden a la matriz imputada; mucho más rápido, pero las probes ya no intervienen
+      en la imputación.
+    - n_jobs: número de procesos (-1 = todos los cores, 1 = en serie).
+
+    Devuelve:
+      - frequencies: pd.Series feature -> fracción de ejecuciones en las que se mantuvo
+        (ordenada de mayor a menor; empates por posición media en el ranking mRMR)
+      - vt_frequencies: pd.Series feature -> fracción de ejecuciones en las que sobrevivió a VT
+      - kept_features: consenso, features con frequencies >= threshold (mismo orden)
+      - removed_by_vt: variables reales que sobreviven a VT en menos de threshold de las ejecuciones
+      - removed_by_mrmr: variables reales que sobreviven a VT pero no entran en el consenso
+      - runs: kept_features de cada ejecución
+      - seeds: semillas usadas
+    """
+    features = list(X_raw.columns)
+    kwargs = {"n_probes": n_probes, "vt_threshold": vt_threshold, "imputer": imputer}
+    if reuse_imputation:
+        X_raw = minimal_preprocess(X_raw, y, imputer=imputer)
+        kwargs["imputer"] = FunctionTransformer()
+
+    seeds = list(range(seed, seed + n_seeds))
+    n_proc = min(effective_n_jobs(n_jobs), n_seeds)
+    if n_proc == 1:
+        _init_stability(X_raw, y, kwargs)
+        runs = [_stability_task(s) for s in seeds]
+    else:
+        # fork: los workers comparten X_raw sin serializarlo
+        ctx = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=n_proc, mp_context=ctx, initializer=_init_stability,
+                                 initargs=(X_raw, y, kwargs)) as executor:
+            runs = list(executor.map(_stability_task, seeds))
+
+    kept = np.array([np.isin(features, run["kept_features"]) for run in runs])
+    vt_kept = np.array([np.isin(features, run["vt_kept_features"]) for run in runs])
+    positions = np.array([[rank.get(f, len(rank)) for f in features]
+                          for rank in ({f: i for i, f in enumerate(run["ranking_all"])} for run in runs)])
+
+    frequencies = pd.Series(kept.mean(axis=0), index=features)
+    vt_frequencies = pd.Series(vt_kept.mean(axis=0), index=features)
+    order = np.lexsort((positions.mean(axis=0), -frequencies.values))
+    frequencies = frequencies.iloc[order]
+
+    kept_features = [f for f, freq in frequencies.items() if freq >= threshold]
+    removed_by_vt = [f for f in features if vt_frequencies[f] < threshold]
+    removed_by_mrmr = [f for f in features if f not in removed_by_vt and f not in kept_features]
+
+    return {
+        "frequencies": frequencies,
+        "vt_frequencies": vt_frequencies,
+        "kept_features": kept_features,
+        "removed_by_vt": removed_by_vt,
+        "removed_by_mrmr": removed_by_mrmr,
+        "runs": [run["kept_features"] for run in runs],
+        "seeds": seeds,
+    }
+
+
+# ==== 8) Run the pipeline for the selected windows ====
+def run_by_window(df: pd.DataFrame,
+                  n_probes: int = 5, vt_threshold: float = 0.01,
+                  hr_list: tuple = (-1, -24, -48), imputer=None,
+                  n_seeds: int | None = None, n_jobs: int | None = -1) -> dict:
+    """
+    Con n_seeds=None ejecuta una vez `feature_reduction_workflow`; con n_seeds=N usa
+    `stability_selection` sobre N semillas en n_jobs procesos.
+    """
+    df_hr = df[df["hr"].isin(hr_list)].drop(columns=["PatientID", "hr"], errors="ignore")
+
+    y = df_hr["NAV"].astype(int)
+    X = df_hr.drop(columns=["NAV"], errors="ignore")
+    if n_seeds is not None:
+        return stability_selection(X, y, n_seeds=n_seeds, n_probes=n_probes, vt_threshold=vt_threshold,
+                                   imputer=imputer, n_jobs=n_jobs)
+    return feature_reduction_workflow(X, y, n_probes=n_probes, vt_threshold=vt_threshold, imputer=imputer)
+
+
+# Feature ranking function
+def get_ranked_features(X, y, method, n_jobs=None):
+    # Los backends de los selectores basados en modelo se importan solo al usarlos.
+    # `n_jobs` fija los hilos de MI y de los modelos (None = valor por defecto de cada librería)
+    threads = {} if n_jobs is None else {"n_jobs": n_jobs}
+    if method == "SelectKBest_f":
+        selector = SelectKBest(score_func=f_classif, k='all')
+        selector.fit(X, y)
+        scores = selector.scores_
+        return list(X.columns[np.argsort(scores)[::-1]])
+    elif method == "SelectKBest_MI":
+        score_func = mutual_info_classif if n_jobs is None else partial(mutual_info_classif, n_jobs=n_jobs)
+        selector = SelectKBest(score_func=score_func, k='all')
+        selector.fit(X, y)
+        scores = selector.scores_
+        return list(X.columns[np.argsort(scores)[::-1]])
+    elif method == "GenericUnivariateSelect":
+        selector = GenericUnivariateSelect(score_func=f_classif, mode='k_best', param='all')
+        selector.fit(X, y)
+        scores = selector.scores_
+        return list(X.columns[np.argsort(scores)[::-1]])
+    elif method == "VarianceThreshold":
+        variances = X.var()
+        return list(X.columns[np.argsort(variances.values)[::-1]])
+    elif method == "ModelBased_XGB":
+        from xgboost import XGBClassifier
+        model = XGBClassifier(eval_metric='logloss', random_state=42, verbosity=0, **threads)
+        model.fit(X, y)
+        importances = model.feature_importances_
+        return list(X.columns[np.argsort(importances)[::-1]])
+    elif method == "ModelBased_LGBM":
+        from lightgbm import LGBMClassifier
+        model = LGBMClassifier(random_state=42, verbose=-1, **threads)
+        model.fit(X, y)
+        importances = model.booster_.feature_importance(importance_type='gain')
+        return list(X.columns[np.argsort(importances)[::-1]])
+    elif method == "ModelBased_RF":
+        from sklearn.ensemble import RandomForestClassifier
+        model = RandomForestClassifier(random_state=42, verbose=0, **threads)
+        model.fit(X, y)
+        importances = model.feature_importances_
+        return list(X.columns[np.argsort(importances)[::-1]])
+    elif method == "ModelBased_CatBoost":
+        from catboost import CatBoostClassifier
+        model = CatBoostClassifier(random_state=42, verbose=0, **({} if n_jobs is None else {'thread_count': n_jobs}))
+        model.fit(X, y)
+        importances = model.get_feature_importance()
+        return list(X.columns[np.argsort(importances)[::-1]])
+    elif method == "ModelBased_ExtraTrees":
+        from sklearn.ensemble import ExtraTreesClassifier
+        model = ExtraTreesClassifier(random_state=42, verbose=0, **threads)
+        model.fit(X, y)
+        importances = model.feature_importances_
+        return list(X.columns[np.argsort(importances)[::-1]])
+    elif method == "mRMR":
+        return mrmr_ranking(X, y, K=X.shape[1])
+    else:
+        raise ValueError(f"Método de selección desconocido: {method}")
@@ -0,0 +1,136 @@
+"""
+Zero-copy sharing of training matrices between worker processes.
+
+The owner process publishes every matrix once in a `multiprocessing.shared_memory`
+block; workers receive a small picklable `SharedArray` descriptor (block name,
+shape, dtype, memory order) and attach to the block by name, getting a numpy view
+of the same pages. Tasks then only carry row / column index arrays, so their
+pickling cost does not grow with the number of patient-hours.
+
+    with SharedArrays() as shared:
+        spec = shared.publish(X_train)          # owner: one copy into shared memory
+        ...                                     # ship `spec` to the workers
+        X_train = attach(spec)                  # worker: view, no copy
+
+Blocks are unlinked when the `SharedArrays` context exits; workers must not use
+their views afterwards.
+"""
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Blocks attached by this process (kept open while their views are in use) and
+# arrays published by it (attached directly, without mapping the block twice)
+_ATTACHED = {}
+_PUBLISHED = {}
+
+
+class SharedArray(NamedTuple):
+    """Picklable descriptor of an array published in shared memory."""
+    name: str
+    shape: tuple
+    dtype: str
+    order: str
+
+
+class SharedArrays:
+    """
+    Owner of a set of shared-memory blocks (context manager).
+
+    Parameters:
+    order (str): Memory order of the published copies: 'F' (default) makes the columns
+        contiguous, so column subsets X[:, :k] of a published matrix are views.
+    """
+
+    def __init__(self, order='F'):
+        self.order = order
+        self.blocks = []
+
+    def publish(self, array):
+        """
+        Copies `array` (ndarray, DataFrame or Series; DataFrames are published as float64
+        values without their labels) into a new shared-memory block.
+
+        Returns:
+        SharedArray: Descriptor to pass to `attach`.
+        """
+        if isinstance(array, (pd.DataFrame, pd.Series)):
+            array = array.to_numpy(dtype=np.float64 if isinstance(array, pd.DataFrame) else None)
+        array = np.asarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        self.blocks.append(block)
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf, order=self.order)
+        view[...] = array
+        spec = SharedArray(block.name, array.shape, array.dtype.str, self.order)
+        _PUBLISHED[block.name] = view
+        return spec
+
+    def close(self):
+        for block in self.blocks:
+            _PUBLISHED.pop(block.name, None)
+            try:
+                block.close()
+            except BufferError:
+                # Views still alive in this process (serial run): the pages are released
+                # with the last view, the name is removed now
+                pass
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """
+    Returns a read-only numpy view of a published array, without copying it.
+
+    Parameters:
+    spec (SharedArray): Descriptor returned by `SharedArrays.publish`.
+
+    Returns:
+    np.ndarray
+    """
+    if spec.name in _PUBLISHED:
+        array = _PUBLISHED[spec.name].view()
+    else:
+        if spec.name not in _ATTACHED:
+            block = shared_memory.SharedMemory(name=spec.name)
+            if multiprocessing.parent_process() is None:
+                # Process not started by the owner (own resource tracker): the owner unlinks
+                # the block, this tracker must not unlink it when the process exits
+                resource_tracker.unregister(block._name, "shared_memory")
+            _ATTACHED[spec.name] = block
+        array = np.ndarray(spec.shape, dtype=np.dtype(spec.dtype), buffer=_ATTACHED[spec.name].buf, order=spec.order)
+    array.flags.writeable = False
+    return array
+
+
+def publish_split(shared, split):
+    """
+    Publishes the X_train / X_test / y_train / y_test arrays of a benchmark split
+    (`vap_utils.bench.prepare_horizon`).
+
+    Returns:
+    dict: Same keys with SharedArray descriptors, plus 'columns' (feature names).
+    """
+    spec = {key: shared.publish(split[key]) for key in ('X_train', 'X_test', 'y_train', 'y_test')}
+    spec['columns'] = list(split['X_train'].columns)
+    return spec
+
+
+def attach_split(spec):
+    """
+    Rebuilds a split from `publish_split` descriptors: X_train / X_test as DataFrames
+    over the shared pages (no copy) and y_train / y_test as arrays.
+    """
+    split = {key: attach(spec[key]) for key in ('X_train', 'X_test', 'y_train', 'y_test')}
+    for key in ('X_train', 'X_test'):
+        split[key] = pd.DataFrame(split[key], columns=spec['columns'], copy=False)
+    return split
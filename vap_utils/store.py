@@ -0,0 +1,242 @@
+"""
+On-disk results store for the benchmark grid.
+
+Each finished (hr, selector, k, model) cell is written to a SQLite file as soon as
+it completes, together with the ranking of every (hr, selector). A rerun of
+`run_experiment` against the same store only computes the cells that are missing,
+so a crash loses at most the cells in flight and adding an entry to the `models`
+or `selectors` dicts only computes the new cells.
+
+A store belongs to one configuration: the extraction, the imputer, the parameters of
+every model and the options that change the scores (`vap_utils.bench.experiment_config`).
+Their fingerprints are saved with the first cells and a run with a different
+configuration is refused (`check_config`) instead of silently reusing stale cells;
+new models can still be added to an existing store.
+"""
+import json
+import sqlite3
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from vap_utils.metrics import METRICS, TIMINGS
+from vap_utils.results import ResultsTensor
+
+# Columns stored for every cell
+COLUMNS = METRICS + TIMINGS
+
+
+class ResultsStore:
+    """
+    SQLite-backed store of benchmark cells and selector rankings.
+
+    Parameters:
+    path (str): SQLite file, created if it does not exist (e.g. "data/results_v2.sqlite").
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        metric_columns = ", ".join(f"{column} REAL" for column in COLUMNS)
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS cells ("
+                f"hr TEXT, selector TEXT, model TEXT, k INTEGER, {metric_columns}, "
+                f"PRIMARY KEY (hr, selector, model, k))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS rankings ("
+                "hr TEXT, selector TEXT, ranking TEXT, seconds REAL, PRIMARY KEY (hr, selector))"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS config (name TEXT PRIMARY KEY, value TEXT)")
+            # Stores created before the timing columns existed
+            for table, columns in (('cells', TIMINGS), ('rankings', ['seconds'])):
+                existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                for column in columns:
+                    if column not in existing:
+                        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} REAL")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ==== Configuration ====
+    def get_config(self):
+        """Returns the stored configuration fingerprints (name -> value)."""
+        return dict(self.conn.execute("SELECT name, value FROM config"))
+
+    def check_config(self, config):
+        """
+        Checks that the cells of the store were computed with `config` and records the
+        entries the store does not have yet (e.g. a model added to the grid). Raises a
+        ValueError if an entry already stored has a different value: resuming would mix
+        cells of two configurations.
+
+        Parameters:
+        config (dict): Entry name -> fingerprint, see `vap_utils.bench.experiment_config`.
+        """
+        stored = self.get_config()
+        changed = sorted(name for name, value in config.items() if name in stored and stored[name] != str(value))
+        if changed:
+            raise ValueError(f"{self.path} was written with a different configuration ({', '.join(changed)}); "
+                             f"use a new store file.")
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO config (name, value) VALUES (?, ?)",
+                                  [(name, str(value)) for name, value in config.items()])
+
+    # ==== Rankings ====
+    def get_ranking(self, hr, selector):
+        """Returns the stored ranking of (hr, selector) or None."""
+        row = self.conn.execute(
+            "SELECT ranking FROM rankings WHERE hr = ? AND selector = ?", (hr, selector)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def add_ranking(self, hr, selector, ranking, seconds=None):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rankings (hr, selector, ranking, seconds) VALUES (?, ?, ?, ?)",
+                (hr, selector, json.dumps(list(ranking)), seconds)
+            )
+
+    def ranking_times(self):
+        """Returns a DataFrame with the seconds spent computing every stored ranking."""
+        return pd.read_sql_query("SELECT hr, selector, seconds FROM rankings", self.conn)
+
+    def merge(self, path):
+        """
+        Copies every ranking and cell of another store file (e.g. written by a work-queue
+        worker) into this store, replacing the entries it already has. Both stores must
+        have compatible configurations (`check_config`).
+        """
+        with ResultsStore(path) as other:
+            self.check_config(other.get_config())
+        self.conn.execute("ATTACH DATABASE ? AS other", (path,))
+        try:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO rankings (hr, selector, ranking, seconds) "
+                                  "SELECT hr, selector, ranking, seconds FROM other.rankings")
+                self.conn.execute(f"INSERT OR REPLACE INTO cells (hr, selector, model, k, {', '.join(COLUMNS)}) "
+                                  f"SELECT hr, selector, model, k, {', '.join(COLUMNS)} FROM other.cells")
+        finally:
+            self.conn.execute("DETACH DATABASE other")
+
+    # ==== Cells ====
+    def completed(self):
+        """Returns the set of stored (hr, selector, k, model) cells."""
+        return set(self.conn.execute("SELECT hr, selector, k, model FROM cells"))
+
+    def load_cells(self):
+        """Returns {(hr, selector, k, model): scores} for every stored cell (NULL read back as NaN)."""
+        rows = self.conn.execute(f"SELECT hr, selector, k, model, {', '.join(COLUMNS)} FROM cells")
+        return {
+            (hr, selector, k, model): {column: np.nan if value is None else value
+                                       for column, value in zip(COLUMNS, values)}
+            for hr, selector, k, model, *values in rows
+        }
+
+    def add_cell(self, hr, selector, k, model, scores):
+        """
+        Appends one finished cell; `scores` maps every metric in METRICS (and optionally
+        every measurement in TIMINGS) to its value.
+        """
+        values = [scores.get(column, np.nan) for column in COLUMNS]
+        values = [None if np.isnan(value) else float(value) for value in values]
+        with self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO cells (hr, selector, model, k, {', '.join(COLUMNS)}) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' * len(COLUMNS))})",
+                (hr, selector, model, int(k), *values)
+            )
+
+    def load_results(self, hr_list=None, selector_names=None, model_names=None):
+        """
+        Rebuilds the nested layout returned by `run_experiment`.
+
+        Parameters:
+        hr_list (list or None): Horizons to load, as ints (-24) or keys ('hr=-24'). None loads all.
+        selector_names (list or None): Selectors to load. None loads all.
+        model_names (list or None): Models to load. None loads all.
+
+        Returns:
+        dict: results[f'hr={hr}'][selector][model][column] -> list over k = 1..N for every
+            column of METRICS and TIMINGS, with NaN for the cells that are not stored yet.
+        """
+        rankings = self.conn.execute("SELECT hr, selector, ranking FROM rankings").fetchall()
+        hr_keys = None if hr_list is None else [hr if str(hr).startswith('hr=') else f'hr={hr}' for hr in hr_list]
+        if model_names is None:
+            model_names = [row[0] for row in self.conn.execute(
+                "SELECT model FROM cells GROUP BY model ORDER BY MIN(rowid)"
+            )]
+
+        results = {}
+        for hr, selector, ranking in rankings:
+            if hr_keys is not None and hr not in hr_keys:
+                continue
+            if selector_names is not None and selector not in selector_names:
+                continue
+            n_features = len(json.loads(ranking))
+            results.setdefault(hr, {})[selector] = {}
+            for model in model_names:
+                curves = np.full((len(COLUMNS), n_features), np.nan)
+                rows = self.conn.execute(
+                    f"SELECT k, {', '.join(COLUMNS)} FROM cells WHERE hr = ? AND selector = ? AND model = ?",
+                    (hr, selector, model)
+                )
+                for k, *values in rows:
+                    if k <= n_features:
+                        curves[:, k - 1] = [np.nan if value is None else value for value in values]
+                model_results = defaultdict(list)
+                for column, curve in zip(COLUMNS, curves):
+                    model_results[column] = list(curve)
+                results[hr][selector][model] = model_results
+
+        # Keep the order in which horizons/selectors were requested
+        if hr_keys is not None:
+            results = {hr: results[hr] for hr in hr_keys if hr in results}
+        if selector_names is not None:
+            results = {hr: {s: sel[s] for s in selector_names if s in sel} for hr, sel in results.items()}
+        return results
+
+    def load_tensor(self, hr_list=None, selector_names=None, model_names=None, columns=COLUMNS):
+        """
+        Reads the stored cells into a dense `ResultsTensor` with a single query.
+
+        Parameters:
+        hr_list (list or None): Horizons, as ints (-24) or keys ('hr=-24'). None loads all.
+        selector_names (list or None): Selectors. None loads all, in ranking order.
+        model_names (list or None): Models. None loads all, in order of first insertion.
+        columns (list): Metrics / measurements of the last axis.
+
+        Returns:
+        ResultsTensor: Axes (hr, selector, model, k, metric), k = 1..longest stored ranking,
+            NaN for the cells that are not stored yet.
+        """
+        rankings = self.conn.execute("SELECT hr, selector, ranking FROM rankings ORDER BY rowid").fetchall()
+        hr_keys = (list(dict.fromkeys(hr for hr, _, _ in rankings)) if hr_list is None else
+                   [hr if str(hr).startswith('hr=') else f'hr={hr}' for hr in hr_list])
+        if selector_names is None:
+            selector_names = list(dict.fromkeys(selector for _, selector, _ in rankings))
+        if model_names is None:
+            model_names = [row[0] for row in self.conn.execute(
+                "SELECT model FROM cells GROUP BY model ORDER BY MIN(rowid)"
+            )]
+        n_k = max((len(json.loads(ranking)) for hr, selector, ranking in rankings
+                   if hr in hr_keys and selector in selector_names), default=0)
+
+        cells = pd.read_sql_query(f"SELECT hr, selector, model, k, {', '.join(columns)} FROM cells", self.conn)
+        positions = [cells[axis].map({label: i for i, label in enumerate(labels)})
+                     for axis, labels in (('hr', hr_keys), ('selector', selector_names), ('model', model_names))]
+        keep = np.logical_and.reduce([position.notna().to_numpy() for position in positions]) & (cells['k'] <= n_k).to_numpy()
+        values = np.full((len(hr_keys), len(selector_names), len(model_names), n_k, len(columns)), np.nan)
+        index = tuple(position.to_numpy()[keep].astype(int) for position in positions)
+        values[index + (cells['k'].to_numpy()[keep] - 1,)] = cells[list(columns)].to_numpy(dtype=np.float64)[keep]
+        return ResultsTensor(values, hr_keys, selector_names, model_names, list(columns))
@@ -0,0 +1,627 @@
+"""
+Hyperparameter tuning of the CatBoost models of 03_TRAIN_MODELS.
+
+The Optuna objective of the notebook samples `n_folds` in {3, 4, 5} and used to refit
+IterativeImputer(max_iter=1000) on every fold of every trial. The folds only depend on
+`n_folds` and the fixed StratifiedKFold(shuffle=True, random_state=42), so there are
+3 + 4 + 5 = 12 distinct imputations for the whole study. `precompute_folds` fits them
+once, before the study (in parallel, and reused between sessions through the imputer
+cache); the objective built by `catboost_objective` only indexes into them and
+downsamples each fold by row indices.
+
+    folds = precompute_folds(X_train, y_train, X_train_24, y_train_24)   # validated on -24h
+    study.optimize(catboost_objective(folds), n_trials=500)
+
+Studies are persisted in a SQLite storage, one named study per horizon (`study_name`).
+`run_study` / `run_studies` launch N worker processes against the same study (each
+worker with its share of the cores, the fold matrices shared between them through
+shared memory) and stop once the study holds `n_trials` finished trials, so running
+them again after a crash resumes the study; trials left running by a killed process
+are marked failed after the heartbeat grace period and retried.
+
+    study = run_study(folds, study_name(-1), n_trials=500, n_jobs=-1)
+
+The objective reports its running mean PR-AUC after every fold (`trial.report`), so the
+Optuna pruners (`make_pruner`: median, successive halving, Hyperband) can stop a trial
+whose first folds are already far below the others. With `fidelity='iterations'` or
+`'fraction'` the budget of each step is a share of the CatBoost trees or of the training
+rows instead of one fold; `pruning_benchmark` compares best PR-AUC and CPU time of
+pruned and unpruned studies.
+
+With `early_stopping_rounds`, every fit holds out a stratified share of its training rows
+as CatBoost eval set and keeps the best iteration: the sampled `iterations` become a
+cap and the effective number of trees is recorded (`trial.user_attrs['tree_count']`).
+`fit_early_stopping` picks the number of trees of the final models the same way, then
+refits them on all their training rows.
+
+`quantize_folds` turns the training matrix of every fold into a quantized CatBoost Pool
+once (fixed borders, saved in CatBoost's quantized format under `pool_dir`): trials then
+train on row slices of the pools (`Pool.slice`, which is also how a fold is downsampled)
+instead of handing CatBoost a float matrix that it quantizes again in every fit. Pools
+are opt-in: their borders come from the whole fold rather than from the downsampled rows
+of each fit, so scores can differ slightly from the default float matrices.
+`pool_benchmark` measures the per-trial speed-up and the PR-AUC of both.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import optuna
+import pandas as pd
+from joblib import Parallel, delayed
+from optuna.storages import RDBStorage, RetryFailedTrialCallback
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+from sklearn.base import clone
+from sklearn.experimental import enable_iterative_imputer  # noqa
+from sklearn.impute import IterativeImputer
+from sklearn.metrics import average_precision_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+from vap_utils.bench import limit_threads, n_workers, thread_budget
+from vap_utils.cache import atomic_save, fingerprint, fit_transform_cached
+from vap_utils.registry import load_class, make_model
+from vap_utils.sampling import downsample_indices
+from vap_utils.shared import SharedArray, SharedArrays, attach
+
+logger = logging.getLogger(__name__)
+
+# Values of the `n_folds` hyperparameter sampled by the objective
+N_FOLDS = (3, 4, 5)
+
+# Local SQLite (RDB) storage of the studies
+DEFAULT_STORAGE = "sqlite:///data/optuna.sqlite"
+
+# Trials counted towards `n_trials` (failed trials are retried, not counted)
+FINISHED_STATES = (TrialState.COMPLETE, TrialState.PRUNED)
+
+# Quantized pools loaded by this process, by path
+_POOLS = {}
+
+# Budget of one pruning step: a fold, a share of the trees, a share of the training rows
+FIDELITIES = ('folds', 'iterations', 'fraction')
+PRUNERS = ('median', 'sha', 'hyperband')
+
+
+def fold_indices(y_train, n_folds):
+    """(train, valid) positional indices of the StratifiedKFold(shuffle=True, random_state=42) of the notebook."""
+    cv = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+    return list(cv.split(np.zeros(len(y_train)), y_train))
+
+
+def _impute_fold(imputer, X_train, X_valid, train_idx, valid_idx, imputer_cache):
+    _, X_train_fold, X_valid_fold = fit_transform_cached(clone(imputer), X_train.iloc[train_idx],
+                                                         X_valid.iloc[valid_idx], cache_dir=imputer_cache)
+    return X_train_fold, X_valid_fold
+
+
+def precompute_folds(X_train, y_train, X_valid=None, y_valid=None, n_folds_options=N_FOLDS, imputer=None,
+                     imputer_cache=None, n_jobs=-1):
+    """
+    Imputes every fold the objective can draw, once.
+
+    The imputer is fitted on the training rows of each fold and applied to its validation
+    rows. Validation rows are taken from `X_valid` / `y_valid` at the fold's positions
+    (the cross-horizon `X_train_24` of the -1h and -48h models, aligned row by row with
+    `X_train`) or, by default, from `X_train` itself.
+
+    Parameters:
+    X_train (pd.DataFrame): Training matrix of the horizon (with missing values).
+    y_train (pd.Series): Training labels.
+    X_valid (pd.DataFrame or None): Matrix the validation rows are taken from.
+    y_valid (pd.Series or None): Labels of `X_valid`.
+    n_folds_options (tuple): Values of n_folds to precompute.
+    imputer (estimator or None): Unfitted imputer (default IterativeImputer(max_iter=1000, random_state=42)).
+    imputer_cache (str or None): Directory of `fit_transform_cached`, so that a restarted
+        notebook loads the fold imputations instead of refitting them.
+    n_jobs (int or None): Imputations fitted in parallel processes (-1 = all cores).
+
+    Returns:
+    dict: n_folds -> list of folds, each a dict with X_train / y_train / X_valid / y_valid numpy arrays.
+    """
+    if X_valid is None:
+        X_valid, y_valid = X_train, y_train
+    imputer = IterativeImputer(max_iter=1000, random_state=42) if imputer is None else imputer
+    y_train, y_valid = np.asarray(y_train), np.asarray(y_valid)
+
+    splits = [(n_folds, train_idx, valid_idx)
+              for n_folds in n_folds_options
+              for train_idx, valid_idx in fold_indices(y_train, n_folds)]
+    imputed = Parallel(n_jobs=min(n_workers(n_jobs), len(splits)))(
+        delayed(_impute_fold)(imputer, X_train, X_valid, train_idx, valid_idx, imputer_cache)
+        for _, train_idx, valid_idx in splits
+    )
+
+    folds = {n_folds: [] for n_folds in n_folds_options}
+    for (n_folds, train_idx, valid_idx), (X_train_fold, X_valid_fold) in zip(splits, imputed):
+        folds[n_folds].append({'X_train': X_train_fold, 'y_train': y_train[train_idx],
+                               'X_valid': X_valid_fold, 'y_valid': y_valid[valid_idx]})
+    return folds
+
+
+def quantize_folds(folds, pool_dir="data/cache/pools", border_count=254):
+    """
+    Quantizes the training matrix of every fold into a CatBoost Pool, once.
+
+    Borders are computed on the whole training fold and then fixed: every trial trains on
+    a row slice of the same quantized pool. A fit on all the rows of the fold gives the
+    same model as the float matrix; on a downsampled slice the borders differ from those
+    CatBoost would compute on the slice, so scores can move slightly. Pools are saved in CatBoost's quantized
+    format, keyed by a hash of the fold and `border_count`, so later sessions and the
+    study workers load them instead of quantizing again.
+
+    Parameters:
+    folds (dict): Output of `precompute_folds`.
+    pool_dir (str): Directory of the saved pools.
+    border_count (int): Borders per feature (CatBoost default on CPU: 254).
+
+    Returns:
+    dict: Same folds, each with a 'pool' entry (path of its quantized pool) used by
+        `catboost_objective` for training; validation rows stay float matrices.
+    """
+    Pool = load_class('catboost', 'Pool')
+    os.makedirs(pool_dir, exist_ok=True)
+    quantized = {}
+    for n_folds, fold_list in folds.items():
+        quantized[n_folds] = []
+        for fold in fold_list:
+            path = os.path.join(pool_dir, f"{fingerprint(fold['X_train'], fold['y_train'], border_count)}.bin")
+            if not os.path.exists(path):
+                pool = Pool(fold['X_train'], label=fold['y_train'])
+                pool.quantize(border_count=border_count)
+                atomic_save(path, pool.save)
+            quantized[n_folds].append({**fold, 'pool': path})
+    return quantized
+
+
+def _load_pool(path):
+    if path not in _POOLS:
+        _POOLS[path] = load_class('catboost', 'Pool')(f"quantized://{path}")
+    return _POOLS[path]
+
+
+def _train_data(fold, rows):
+    # (X, y) of fit() for the given training rows: a slice of the quantized pool of the
+    # fold (labels inside the pool) or the float rows
+    if 'pool' in fold:
+        return _load_pool(fold['pool']).slice(rows), None
+    return fold['X_train'][rows], fold['y_train'][rows]
+
+
+def suggest_catboost_params(trial):
+    """
+    Samples the search space of the notebook.
+
+    Returns:
+    tuple: (CatBoost parameters, majority_proportion, n_folds).
+    """
+    param_space = {
+        'depth': trial.suggest_int('depth', 3, 7),
+        'learning_rate': trial.suggest_float('learning_rate', 0.001, 0.3, log=True),
+        'iterations': trial.suggest_int('iterations', 100, 500, step=50),
+        'l2_leaf_reg': trial.suggest_float('l2_leaf_reg', 1.0, 10.0),
+        'subsample': trial.suggest_float('subsample', 0.7, 1.0, step=0.1)
+    }
+    majority_proportion = trial.suggest_categorical('majority_proportion', [0.8, 0.9, 1.0, 1.1, 1.2])
+    n_folds = trial.suggest_categorical('n_folds', list(N_FOLDS))
+    return param_space, majority_proportion, n_folds
+
+
+def early_stopping_split(y, eval_fraction=0.15, random_state=42):
+    """
+    Stratified (fit, eval) positions of an inner early-stopping split, each kept in the
+    original row order.
+    """
+    positions = np.arange(len(y))
+    fit_idx, eval_idx = train_test_split(positions, test_size=eval_fraction, random_state=random_state,
+                                         stratify=np.asarray(y))
+    return np.sort(fit_idx), np.sort(eval_idx)
+
+
+def fit_early_stopping(model, X, y, early_stopping_rounds=50, eval_fraction=0.15, random_state=42):
+    """
+    Fits a CatBoost model on all its training rows, with the number of trees chosen by
+    early stopping.
+
+    A copy of the model is first fitted on an inner split: `eval_fraction` of the rows
+    (stratified) are the eval set, and training stops after `early_stopping_rounds`
+    iterations without improvement of the eval loss. The model is then refitted on every
+    row with `iterations` set to the best iteration of that copy, so `model.tree_count_`
+    is the effective number of trees (at most the `iterations` parameter) and no
+    training row is held out of the final model.
+
+    Parameters:
+    model (CatBoostClassifier): Unfitted model.
+    X (array-like): Training matrix (already imputed / downsampled).
+    y (array-like): Training labels.
+    early_stopping_rounds (int): Patience in iterations.
+    eval_fraction (float): Share of the rows used as eval set by the inner fit.
+    random_state (int): Seed of the inner split.
+
+    Returns:
+    CatBoostClassifier: The fitted model.
+    """
+    X, y = np.asarray(X), np.asarray(y)
+    fit_idx, eval_idx = early_stopping_split(y, eval_fraction, random_state)
+    probe = clone(model)
+    probe.fit(X[fit_idx], y[fit_idx], eval_set=(X[eval_idx], y[eval_idx]),
+              early_stopping_rounds=early_stopping_rounds, use_best_model=True)
+    model.set_params(iterations=probe.tree_count_)
+    model.fit(X, y)
+    return model
+
+
+def _fit_score(fold, rows, params, init_model=None, early_stopping_rounds=None):
+    model = make_model('CatBoost', **params)
+    if early_stopping_rounds is not None:
+        fit_idx, eval_idx = early_stopping_split(fold['y_train'][rows])
+        X_eval, y_eval = _train_data(fold, rows[eval_idx])
+        model.fit(*_train_data(fold, rows[fit_idx]), eval_set=X_eval if y_eval is None else (X_eval, y_eval),
+                  early_stopping_rounds=early_stopping_rounds, use_best_model=True)
+    elif init_model is None:
+        model.fit(*_train_data(fold, rows))
+    else:
+        model.fit(*_train_data(fold, rows), init_model=init_model)
+    return model, average_precision_score(fold['y_valid'], model.predict_proba(fold['X_valid'])[:, 1])
+
+
+def _report(trial, value, tree_count, step, start):
+    # CPU time of the process (all CatBoost threads) spent by the trial so far
+    trial.set_user_attr('cpu_seconds', time.process_time() - start)
+    trial.set_user_attr('tree_count', float(tree_count))
+    trial.report(value, step)
+    if trial.should_prune():
+        raise optuna.TrialPruned()
+
+
+def _row_subset(rows, fraction):
+    # Same random subset for every trial, kept in the order of `rows`; fraction=1 gives `rows`
+    keep = np.random.RandomState(42).permutation(len(rows))[:max(1, int(round(len(rows) * fraction)))]
+    return rows[np.sort(keep)]
+
+
+def catboost_objective(folds, fidelity='folds', n_rungs=3, early_stopping_rounds=None, **model_params):
+    """
+    Builds the Optuna objective: mean validation PR-AUC over the folds of the sampled
+    n_folds, each fold downsampled with the sampled majority_proportion.
+
+    Intermediate values are reported for the pruner of the study, at steps given by `fidelity`:
+        - 'folds': running mean PR-AUC after each fold (step = fold).
+        - 'iterations': every fold trained in `n_rungs` chunks of its trees, each chunk
+          continuing the previous model (init_model); mean PR-AUC after each chunk.
+        - 'fraction': every fold trained on 1/n_rungs, 2/n_rungs... of its training rows;
+          mean PR-AUC after each share (the full rows give the final value).
+    The CPU seconds of every trial are kept in `trial.user_attrs['cpu_seconds']` and the
+    mean number of trees of its last fits in `trial.user_attrs['tree_count']`.
+
+    Parameters:
+    folds (dict): Output of `precompute_folds` (must cover every value of N_FOLDS), or of
+        `quantize_folds` to train on the quantized pools.
+    fidelity (str): One of FIDELITIES.
+    n_rungs (int): Steps of the 'iterations' and 'fraction' fidelities.
+    early_stopping_rounds (int or None): If set, every fit stops early on an inner eval
+        split of its training rows (see `fit_early_stopping`). Not combinable with the
+        'iterations' fidelity, which already splits the trees into chunks.
+    **model_params: Fixed CatBoostClassifier parameters (e.g. thread_count).
+
+    Returns:
+    callable: objective(trial) -> float.
+    """
+    if fidelity not in FIDELITIES:
+        raise ValueError(f"Unknown fidelity: {fidelity}. Available: {list(FIDELITIES)}")
+    if fidelity == 'iterations' and early_stopping_rounds is not None:
+        raise ValueError("early_stopping_rounds cannot be combined with the 'iterations' fidelity.")
+
+    def objective(trial):
+        param_space, majority_proportion, n_folds = suggest_catboost_params(trial)
+        params = {**model_params, **param_space}
+        fold_list = folds[n_folds]
+        rows = [downsample_indices(fold['y_train'], majority_proportion=majority_proportion) for fold in fold_list]
+        start = time.process_time()
+
+        if fidelity == 'folds':
+            pr_aucs, tree_counts = [], []
+            for step, (fold, fold_rows) in enumerate(zip(fold_list, rows)):
+                model, pr_auc = _fit_score(fold, fold_rows, params, early_stopping_rounds=early_stopping_rounds)
+                pr_aucs.append(pr_auc)
+                tree_counts.append(model.tree_count_)
+                _report(trial, np.mean(pr_aucs), np.mean(tree_counts), step, start)
+        elif fidelity == 'iterations':
+            chunks = np.diff(np.linspace(0, params['iterations'], n_rungs + 1).round().astype(int))
+            models = [None] * len(fold_list)
+            for step, chunk in enumerate(chunks):
+                pr_aucs = []
+                for i, (fold, fold_rows) in enumerate(zip(fold_list, rows)):
+                    models[i], pr_auc = _fit_score(fold, fold_rows, {**params, 'iterations': int(chunk)}, models[i])
+                    pr_aucs.append(pr_auc)
+                _report(trial, np.mean(pr_aucs), np.mean([model.tree_count_ for model in models]), step, start)
+        else:
+            for step in range(n_rungs):
+                fraction = (step + 1) / n_rungs
+                fits = [_fit_score(fold, _row_subset(fold_rows, fraction), params,
+                                   early_stopping_rounds=early_stopping_rounds)
+                        for fold, fold_rows in zip(fold_list, rows)]
+                pr_aucs = [pr_auc for _, pr_auc in fits]
+                _report(trial, np.mean(pr_aucs), np.mean([model.tree_count_ for model, _ in fits]), step, start)
+        return np.mean(pr_aucs)
+    return objective
+
+
+def make_pruner(name, fidelity='folds', n_rungs=3):
+    """
+    Optuna pruner by name.
+
+    Parameters:
+    name (str or None): 'median' (MedianPruner: stop below the median of previous trials
+        at the same step, from the first fold on), 'sha' (SuccessiveHalvingPruner),
+        'hyperband' (HyperbandPruner) or None (no pruning).
+    fidelity (str): Fidelity of the objective; sets the maximum number of steps
+        (max(N_FOLDS) for 'folds', `n_rungs` otherwise).
+
+    Returns:
+    optuna.pruners.BasePruner
+    """
+    if name is None:
+        return optuna.pruners.NopPruner()
+    if name not in PRUNERS:
+        raise ValueError(f"Unknown pruner: {name}. Available: {list(PRUNERS)} or None")
+    if name == 'median':
+        return optuna.pruners.MedianPruner(n_startup_trials=10, n_warmup_steps=0)
+    if name == 'sha':
+        return optuna.pruners.SuccessiveHalvingPruner(min_resource=1, reduction_factor=3)
+    max_steps = max(N_FOLDS) if fidelity == 'folds' else n_rungs
+    return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=max_steps, reduction_factor=3)
+
+
+def pruning_benchmark(folds, pruners=(None, 'median', 'sha', 'hyperband'), n_trials=100, fidelity='folds',
+                      n_rungs=3, seed=42, early_stopping_rounds=None, **model_params):
+    """
+    Runs one in-memory study per pruner (same sampler seed) and compares the best
+    PR-AUC found with the CPU time spent.
+
+    Parameters:
+    folds (dict): Output of `precompute_folds`.
+    pruners (tuple): Names for `make_pruner` (None = unpruned reference).
+    n_trials (int): Trials of every study.
+    fidelity (str), n_rungs (int), early_stopping_rounds (int or None): See `catboost_objective`.
+    seed (int): Seed of the TPE sampler of every study.
+
+    Returns:
+    tuple: (summary, trace) DataFrames. summary has one row per pruner (best PR-AUC,
+        total CPU seconds, complete / pruned trials); trace has one row per trial with
+        the cumulative CPU seconds and the best PR-AUC so far, to plot one against the other.
+    """
+    summary, trace = [], []
+    for pruner in pruners:
+        study = optuna.create_study(direction='maximize', sampler=optuna.samplers.TPESampler(seed=seed),
+                                    pruner=make_pruner(pruner, fidelity, n_rungs))
+        objective = catboost_objective(folds, fidelity, n_rungs, early_stopping_rounds, **model_params)
+        study.optimize(objective, n_trials=n_trials)
+
+        trials = study.get_trials(deepcopy=False, states=FINISHED_STATES)
+        cpu_seconds = np.cumsum([trial.user_attrs.get('cpu_seconds', 0.0) for trial in trials])
+        # Pruned trials only have a partial value: the best is taken over complete trials
+        values = [trial.value if trial.state == TrialState.COMPLETE else -np.inf for trial in trials]
+        best = np.maximum.accumulate(values)
+        label = 'none' if pruner is None else pruner
+        trace.extend({'pruner': label, 'trial': i, 'cpu_seconds': cpu, 'best_pr_auc': value}
+                     for i, (cpu, value) in enumerate(zip(cpu_seconds, best)))
+        summary.append({'pruner': label, 'fidelity': fidelity, 'best_pr_auc': best[-1],
+                        'cpu_seconds': cpu_seconds[-1],
+                        'mean_tree_count': np.mean([trial.user_attrs.get('tree_count', np.nan) for trial in trials]),
+                        'complete': sum(trial.state == TrialState.COMPLETE for trial in trials),
+                        'pruned': sum(trial.state == TrialState.PRUNED for trial in trials)})
+        logger.info("[tuning] pruner=%s: best %.4f in %.0f CPU s", label, best[-1], cpu_seconds[-1])
+    return pd.DataFrame(summary).set_index('pruner'), pd.DataFrame(trace)
+
+
+def pool_benchmark(folds, n_trials=20, seed=42, pool_dir="data/cache/pools", **objective_params):
+    """
+    Measures the per-trial speed-up of training on quantized pools.
+
+    Runs `n_trials` trials on the float matrices, then the same trials (same parameters,
+    enqueued) on the pools of `quantize_folds`, without pruning.
+
+    Parameters:
+    folds (dict): Output of `precompute_folds`.
+    n_trials (int): Trials of each run.
+    seed (int): Seed of the TPE sampler of the float run.
+    pool_dir (str): Directory of `quantize_folds`.
+    **objective_params: Keyword arguments of `catboost_objective` (e.g. early_stopping_rounds).
+
+    Returns:
+    pd.DataFrame: One row per trial with the seconds and PR-AUC of both runs and the
+        speed-up; the one-off quantization time is in `df.attrs['quantize_seconds']`.
+    """
+    start = time.perf_counter()
+    pool_folds = quantize_folds(folds, pool_dir)
+    quantize_seconds = time.perf_counter() - start
+
+    runs = {}
+    for label, run_folds in (('float', folds), ('pool', pool_folds)):
+        study = optuna.create_study(direction='maximize', sampler=optuna.samplers.TPESampler(seed=seed),
+                                    pruner=optuna.pruners.NopPruner())
+        for trial in runs.get('float', []):
+            study.enqueue_trial(trial.params)
+        study.optimize(catboost_objective(run_folds, **objective_params), n_trials=n_trials)
+        runs[label] = study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,))
+
+    df = pd.DataFrame({
+        'seconds_float': [trial.duration.total_seconds() for trial in runs['float']],
+        'seconds_pool': [trial.duration.total_seconds() for trial in runs['pool']],
+        'pr_auc_float': [trial.value for trial in runs['float']],
+        'pr_auc_pool': [trial.value for trial in runs['pool']],
+    })
+    df['speedup'] = df['seconds_float'] / df['seconds_pool']
+    df.attrs['quantize_seconds'] = quantize_seconds
+    logger.info("[tuning] pools: %.2fx median per-trial speed-up (quantization %.1fs once)",
+                df['speedup'].median(), quantize_seconds)
+    return df
+
+
+# ==== Persistent, multi-process studies ====
+def study_name(hr, model_name='CatBoost'):
+    """Name of the study of one horizon in the storage, e.g. 'CatBoost_hr=-24'."""
+    return f"{model_name}_hr={hr}"
+
+
+def get_storage(storage=DEFAULT_STORAGE, heartbeat_interval=60, grace_period=180):
+    """
+    Opens the RDB storage of the studies.
+
+    Running trials send a heartbeat every `heartbeat_interval` seconds; a trial silent for
+    `grace_period` seconds (its process was killed) is marked failed when a worker starts
+    and its parameters are enqueued again (RetryFailedTrialCallback).
+
+    Parameters:
+    storage (str or RDBStorage): SQLAlchemy URL, e.g. "sqlite:///data/optuna.sqlite"
+        (the directory is created if needed).
+
+    Returns:
+    RDBStorage
+    """
+    if not isinstance(storage, str):
+        return storage
+    if storage.startswith("sqlite:///"):
+        directory = os.path.dirname(storage.removeprefix("sqlite:///"))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    return RDBStorage(
+        storage,
+        # Workers write to the same SQLite file: wait for the lock instead of failing
+        engine_kwargs={"connect_args": {"timeout": 120}} if storage.startswith("sqlite") else None,
+        heartbeat_interval=heartbeat_interval,
+        grace_period=grace_period,
+        failed_trial_callback=RetryFailedTrialCallback(max_retry=3),
+    )
+
+
+def create_study(name, storage=DEFAULT_STORAGE, seed=None, pruner=None):
+    """
+    Creates the study `name` in `storage`, or loads it if it exists (resume).
+
+    Parameters:
+    name (str): Study name (see `study_name`).
+    storage (str or RDBStorage): Storage URL or object.
+    seed (int or None): Seed of the TPE sampler.
+    pruner (optuna pruner or None): Pruner of this process (pruners are not stored with
+        the study). None disables pruning (instead of Optuna's default MedianPruner).
+
+    Returns:
+    optuna.Study
+    """
+    # constant_liar: parallel workers do not sample next to trials that are still running
+    sampler = optuna.samplers.TPESampler(seed=seed, constant_liar=True)
+    pruner = optuna.pruners.NopPruner() if pruner is None else pruner
+    return optuna.create_study(study_name=name, storage=get_storage(storage), sampler=sampler, pruner=pruner,
+                               direction='maximize', load_if_exists=True)
+
+
+def n_finished(study):
+    """Number of trials of `study` counted towards `n_trials`."""
+    return len(study.get_trials(deepcopy=False, states=FINISHED_STATES))
+
+
+def _publish_folds(shared, folds):
+    # Matrices go to shared memory; pool paths are passed as they are (each worker loads the pools)
+    return {n_folds: [{key: shared.publish(value) if isinstance(value, np.ndarray) else value
+                       for key, value in fold.items()} for fold in fold_list]
+            for n_folds, fold_list in folds.items()}
+
+
+def _attach_folds(spec):
+    return {n_folds: [{key: attach(value) if isinstance(value, SharedArray) else value
+                       for key, value in fold.items()} for fold in fold_list]
+            for n_folds, fold_list in spec.items()}
+
+
+def _optimize(name, storage, folds, n_trials, threads, seed, pruner, options):
+    # Runs trials until the study (shared by all the workers) holds n_trials; options are
+    # the keyword arguments of catboost_objective
+    study = create_study(name, storage, seed, make_pruner(pruner, options['fidelity'], options['n_rungs']))
+    if n_finished(study) >= n_trials:
+        return 0
+    model_params = {} if threads is None else {'thread_count': threads}
+    callback = MaxTrialsCallback(n_trials, states=FINISHED_STATES)
+    study.optimize(catboost_objective(folds, **options, **model_params), callbacks=[callback])
+    return n_finished(study)
+
+
+def _study_worker(name, storage, folds_spec, n_trials, threads, seed, pruner, options):
+    # `storage` arrives pickled: RDBStorage only pickles its URL and settings (heartbeat,
+    # grace period, retry callback, engine arguments), so the worker builds its own engine
+    limit_threads(threads)
+    return _optimize(name, storage, _attach_folds(folds_spec), n_trials, threads, seed, pruner, options)
+
+
+def run_studies(studies, storage=DEFAULT_STORAGE, n_trials=500, n_jobs=-1, threads_per_worker=None, seed=None,
+                pruner=None, fidelity='folds', n_rungs=3, early_stopping_rounds=None):
+    """
+    Runs several studies at once (e.g. the three horizons) with worker processes sharing
+    the storage. Every study stops when it holds `n_trials` finished trials, counting
+    those of previous runs: calling it again after an interruption resumes the studies.
+
+    Parameters:
+    studies (dict): Study name -> folds (`precompute_folds`) of that study.
+    storage (str or RDBStorage): Storage URL (default a local SQLite file, see
+        `get_storage`) or storage object; the settings of an RDBStorage (heartbeat, grace
+        period, retry callback) are kept in every worker.
+    n_trials (int): Finished (complete or pruned) trials per study.
+    n_jobs (int or None): Worker processes in total (-1 = all cores), split evenly
+        between the studies (at least one each; extra workers wait for a free core).
+    threads_per_worker (int or None): CatBoost threads of every worker (default an even
+        split of the cores, see `vap_utils.bench.thread_budget`).
+    seed (int or None): Base seed of the samplers (worker i uses seed + i).
+    pruner (str or None): Pruner name for `make_pruner` (None = no pruning).
+    fidelity (str), n_rungs (int): Pruning steps of the objective (see `catboost_objective`).
+    early_stopping_rounds (int or None): Early stopping of every fit (see `catboost_objective`).
+
+    Returns:
+    dict: Study name -> optuna.Study loaded from the storage.
+    """
+    storage = get_storage(storage)
+    options = {'fidelity': fidelity, 'n_rungs': n_rungs, 'early_stopping_rounds': early_stopping_rounds}
+    workers, threads = thread_budget(n_jobs, threads_per_worker)
+    per_study = max(1, workers // len(studies))
+    # Create the studies (and the storage tables) before the workers race for them
+    for name in studies:
+        create_study(name, storage, seed)
+    # No open connection of this process is inherited by the forked workers
+    storage.engine.dispose()
+    logger.info("[tuning] %d studies × %d workers × %d threads", len(studies), per_study, threads)
+
+    tasks = [(name, i) for name in studies for i in range(per_study)]
+    if len(tasks) == 1:
+        name, _ = tasks[0]
+        _optimize(name, storage, studies[name], n_trials, None, seed, pruner, options)
+    else:
+        with SharedArrays() as shared, ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            specs = {name: _publish_folds(shared, folds) for name, folds in studies.items()}
+            futures = [executor.submit(_study_worker, name, storage, specs[name], n_trials, threads,
+                                       None if seed is None else seed + i, pruner, options)
+                       for i, (name, _) in enumerate(tasks)]
+            for future in futures:
+                future.result()
+
+    results = {name: create_study(name, storage) for name in studies}
+    for name, study in results.items():
+        if study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,)):
+            logger.info("[tuning] %s: %d trials, best %.4f", name, n_finished(study), study.best_value)
+        else:
+            # best_value raises when no trial completed (all pruned or failed)
+            logger.warning("[tuning] %s: %d trials, none completed", name, n_finished(study))
+    return results
+
+
+def run_study(folds, name, storage=DEFAULT_STORAGE, n_trials=500, n_jobs=-1, threads_per_worker=None, seed=None,
+              pruner=None, fidelity='folds', n_rungs=3, early_stopping_rounds=None):
+    """
+    Runs (or resumes) one persistent study with `n_jobs` worker processes; see `run_studies`.
+
+    Returns:
+    optuna.Study
+    """
+    return run_studies({name: folds}, storage, n_trials, n_jobs, threads_per_worker, seed, pruner, fidelity,
+                       n_rungs, early_stopping_rounds)[name]
@@ -0,0 +1,299 @@
+"""
+File-based work queue to shard the benchmark grid across processes and machines.
+
+A directory visible to every worker (local disk, NFS or SMB share) is the only
+coordination point; no scheduler or network service is needed:
+
+    <queue_dir>/job.pkl                  extraction, models, selectors and imputer of the run
+    <queue_dir>/pending/<task>.json      (hr, selector, k range) tasks waiting for a worker
+    <queue_dir>/claimed/<task>__<host>__<pid>.json
+                                         tasks being run, named after their owner
+    <queue_dir>/done/<task>.json         finished tasks
+    <queue_dir>/rankings/<hr>__<selector>.json
+                                         ranking shared by every task of a (hr, selector)
+    <queue_dir>/stores/<host>__<pid>.sqlite
+                                         ResultsStore written by each worker
+
+A worker claims a task by renaming it from pending/ to claimed/ (a rename is atomic:
+exactly one worker wins), touches the claimed file every `heartbeat` seconds while it
+runs, writes every cell to its own store and moves the task to done/. Any worker
+re-queues the claimed tasks whose heartbeat is older than `stale_after` seconds, or
+whose owner is a dead process of the same machine. Every worker writes to its own
+SQLite file (SQLite locking is not reliable on network file systems); `collect`
+merges them into the main store.
+
+    submit("data/queue", df, [-1, -24, -48], selector_names, models)
+    # on every box, as many times as wanted:
+    #   python -m vap_utils.workqueue worker data/queue
+    with ResultsStore("data/results_v2.sqlite") as store:
+        collect("data/queue", store)
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+import joblib
+
+from vap_utils.bench import evaluate_cell, experiment_config, prepare_horizon, split_key
+from vap_utils.cache import atomic_save
+from vap_utils.selection import get_ranked_features
+from vap_utils.store import ResultsStore
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DIRS = ('pending', 'claimed', 'done', 'rankings', 'stores')
+
+
+def _write_json(path, content):
+    def save(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(content, f)
+    atomic_save(path, save)
+
+
+def _task_name(path):
+    # 'claimed/t00012__host__123.json' -> 't00012'
+    return os.path.basename(path).split('__')[0].removesuffix('.json')
+
+
+def submit(queue_dir, df, hr_list, selector_names, models, k_chunk=10, imputer_cache=None, imputer=None):
+    """
+    Creates a queue with one task per (hr, selector, range of `k_chunk` values of k);
+    every task evaluates all the models on its k range.
+
+    Parameters:
+    queue_dir (str): Shared directory of the queue (created if needed).
+    df (pd.DataFrame): Extraction with 'PatientID', 'hr', 'NAV' and the feature columns.
+    hr_list (list): Horizons to evaluate.
+    selector_names (list): Names understood by `get_ranked_features`.
+    models (dict): Model name -> unfitted estimator.
+    k_chunk (int): Number of k values per task.
+    imputer_cache (str or None): Fitted-imputer cache directory; a shared path lets
+        workers on other machines reuse the imputation of the first one.
+    imputer (estimator or None): Unfitted imputer replacing the default IterativeImputer.
+
+    Returns:
+    int: Number of tasks queued.
+    """
+    for name in QUEUE_DIRS:
+        os.makedirs(os.path.join(queue_dir, name), exist_ok=True)
+    job = {'df': df, 'hr_list': list(hr_list), 'selector_names': list(selector_names), 'models': models,
+           'imputer_cache': imputer_cache, 'imputer': imputer, 'config': experiment_config(df, models, imputer)}
+    atomic_save(os.path.join(queue_dir, 'job.pkl'), lambda tmp_path: joblib.dump(job, tmp_path))
+
+    # k goes up to the number of features; workers stop at the length of the ranking
+    n_features = df.shape[1] - len({'PatientID', 'hr', 'NAV'} & set(df.columns))
+    tasks = [{'hr': hr, 'selector': selector_name, 'k_start': k_start, 'k_end': min(k_start + k_chunk - 1, n_features)}
+             for hr in hr_list
+             for selector_name in selector_names
+             for k_start in range(1, n_features + 1, k_chunk)]
+    for i, task in enumerate(tasks):
+        _write_json(os.path.join(queue_dir, 'pending', f"t{i:05d}.json"), task)
+    logger.info("[workqueue] %d tasks queued in %s", len(tasks), queue_dir)
+    return len(tasks)
+
+
+def status(queue_dir):
+    """Returns the number of pending, claimed and done tasks."""
+    return {name: len(os.listdir(os.path.join(queue_dir, name))) for name in ('pending', 'claimed', 'done')}
+
+
+def _owner_alive(path, stale_after, now):
+    try:
+        if now - os.path.getmtime(path) > stale_after:
+            return False
+    except FileNotFoundError:
+        return True  # finished or re-queued meanwhile
+    _, host, pid = os.path.basename(path).removesuffix('.json').split('__')
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def requeue_stale(queue_dir, stale_after=300):
+    """
+    Moves back to pending/ the claimed tasks whose owner stopped sending heartbeats for
+    `stale_after` seconds or is a dead process of this machine.
+
+    Returns:
+    list: Names of the re-queued tasks.
+    """
+    now = time.time()
+    requeued = []
+    claimed_dir = os.path.join(queue_dir, 'claimed')
+    for file_name in sorted(os.listdir(claimed_dir)):
+        path = os.path.join(claimed_dir, file_name)
+        if _owner_alive(path, stale_after, now):
+            continue
+        try:
+            os.rename(path, os.path.join(queue_dir, 'pending', f"{_task_name(path)}.json"))
+        except FileNotFoundError:
+            continue  # another worker re-queued it first
+        requeued.append(_task_name(path))
+        logger.warning("[workqueue] re-queued %s (owner %s lost)", _task_name(path), file_name)
+    return requeued
+
+
+def claim(queue_dir, worker_id):
+    """
+    Atomically claims the first pending task.
+
+    Returns:
+    tuple or None: (path of the claimed file, task dict), None when nothing is pending.
+    """
+    pending_dir = os.path.join(queue_dir, 'pending')
+    for file_name in sorted(os.listdir(pending_dir)):
+        pending_path = os.path.join(pending_dir, file_name)
+        claimed_path = os.path.join(queue_dir, 'claimed', f"{file_name.removesuffix('.json')}__{worker_id}.json")
+        try:
+            # Fresh mtime first: the claimed file must never look stale to other workers
+            os.utime(pending_path)
+            os.rename(pending_path, claimed_path)
+        except FileNotFoundError:
+            continue  # claimed by another worker
+        with open(claimed_path) as f:
+            return claimed_path, json.load(f)
+    return None
+
+
+def _heartbeat(path, interval, stop):
+    while not stop.wait(interval):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return  # re-queued by another worker: stop claiming it
+
+
+def shared_ranking(queue_dir, hr, selector_name, split):
+    """
+    Ranking of (hr, selector) shared by every worker. The first worker to finish it
+    publishes it; later ones read the published one (rankings such as mutual information
+    are not deterministic, so all tasks of a selector must use the same one).
+    """
+    path = os.path.join(queue_dir, 'rankings', f"{split_key(hr)}__{selector_name}.json")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        ranking = list(get_ranked_features(split['X_train'], split['y_train'], selector_name))
+        seconds = time.perf_counter() - start
+        tmp_path = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({'ranking': ranking, 'seconds': seconds}, f)
+        try:
+            # link() fails if the file exists: the first published ranking wins
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_worker(queue_dir, stale_after=300, heartbeat=30, poll=10, wait=False):
+    """
+    Claims and runs tasks until the queue is empty.
+
+    Parameters:
+    queue_dir (str): Directory created by `submit`.
+    stale_after (int): Seconds without heartbeat after which a claimed task is re-queued.
+    heartbeat (int): Seconds between two heartbeats of the running task.
+    poll (int): Seconds between two checks when `wait` is True.
+    wait (bool): If True, keep polling while other workers still hold tasks (they may be
+        re-queued); if False, return as soon as nothing is pending.
+
+    Returns:
+    int: Number of tasks completed by this worker.
+    """
+    job = joblib.load(os.path.join(queue_dir, 'job.pkl'))
+    worker_id = f"{socket.gethostname()}__{os.getpid()}"
+    splits = {}
+    completed = 0
+    with ResultsStore(os.path.join(queue_dir, 'stores', f"{worker_id}.sqlite")) as store:
+        store.check_config(job['config'])
+        while True:
+            requeue_stale(queue_dir, stale_after)
+            claimed = claim(queue_dir, worker_id)
+            if claimed is None:
+                if wait and status(queue_dir)['claimed']:
+                    time.sleep(poll)
+                    continue
+                break
+            path, task = claimed
+            stop = threading.Event()
+            beat = threading.Thread(target=_heartbeat, args=(path, heartbeat, stop), daemon=True)
+            beat.start()
+            try:
+                start = time.perf_counter()
+                hr, selector_name = task['hr'], task['selector']
+                if hr not in splits:
+                    splits[hr] = prepare_horizon(job['df'], hr, job['imputer_cache'], job['imputer'])
+                ranking = shared_ranking(queue_dir, hr, selector_name, splits[hr])
+                store.add_ranking(split_key(hr), selector_name, ranking['ranking'], ranking['seconds'])
+                done = store.completed()
+                # mRMR does not rank the features without relevance: its ranking can be
+                # shorter than the k range of the task
+                for k in range(task['k_start'], min(task['k_end'], len(ranking['ranking'])) + 1):
+                    for model_name, model in job['models'].items():
+                        if (split_key(hr), selector_name, k, model_name) in done:
+                            continue
+                        scores = evaluate_cell(splits[hr], ranking['ranking'][:k], model_name, model)
+                        store.add_cell(split_key(hr), selector_name, k, model_name, scores)
+            finally:
+                stop.set()
+                beat.join()
+            try:
+                os.rename(path, os.path.join(queue_dir, 'done', f"{_task_name(path)}.json"))
+            except FileNotFoundError:
+                pass  # re-queued while running: the cells are written again, with the same values
+            completed += 1
+            logger.info("[workqueue] %s done by %s in %.1fs", _task_name(path), worker_id, time.perf_counter() - start)
+    return completed
+
+
+def collect(queue_dir, store):
+    """
+    Merges the stores of every worker into `store` (ResultsStore). The queue's
+    configuration must match the one of `store` (see `ResultsStore.check_config`).
+
+    Returns:
+    dict: `status` of the queue, to check that every task is done.
+    """
+    stores_dir = os.path.join(queue_dir, 'stores')
+    for file_name in sorted(os.listdir(stores_dir)):
+        if file_name.endswith('.sqlite'):
+            store.merge(os.path.join(stores_dir, file_name))
+    return status(queue_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m vap_utils.workqueue",
+                                     description="Benchmark grid worker on a shared-directory queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="claim and run tasks until the queue is empty")
+    worker.add_argument("queue_dir")
+    worker.add_argument("--stale-after", type=int, default=300)
+    worker.add_argument("--heartbeat", type=int, default=30)
+    worker.add_argument("--poll", type=int, default=10)
+    worker.add_argument("--wait", action="store_true", help="keep polling while tasks are claimed by others")
+    commands.add_parser("status", help="print the number of pending / claimed / done tasks").add_argument("queue_dir")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(asctime)s %(message)s", level=logging.INFO)
+    if args.command == "worker":
+        run_worker(args.queue_dir, args.stale_after, args.heartbeat, args.poll, args.wait)
+    else:
+        print(status(args.queue_dir))
+
+
+if __name__ == "__main__":
+    main()